@@ -4,10 +4,14 @@ from sqlalchemy import pool
 from alembic import context
 # Імпортуємо ваші моделі
 from models import Base  # тут треба вказати правильний шлях до вашого файлу моделей
+# URL бази береться з тих самих налаштувань, що й у застосунку (змінна оточення DATABASE_URL)
+from database import DATABASE_URL
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
+# "%" в URL (наприклад, у паролі) треба екранувати для configparser
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -17,6 +21,20 @@ if config.config_file_name is not None:
 # Вказуємо метадані для автоматичної генерації міграцій
 target_metadata = Base.metadata  # Вказуємо метадані з вашого базового класу
 
+# GIN-індекси пошуку створюються сирим SQL лише в Postgres (міграція 8f3c2a1d9b7e) і не описані
+# в models.py, тож autogenerate не повинен пропонувати їх видалити
+SEARCH_INDEXES = {
+    "ix_contacts_owner_first_name_trgm",
+    "ix_contacts_owner_last_name_trgm",
+    "ix_contacts_owner_email_trgm",
+    "ix_contacts_search_document",
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == "index" and reflected and name in SEARCH_INDEXES)
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -39,6 +57,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -62,7 +81,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
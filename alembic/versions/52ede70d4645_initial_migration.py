@@ -18,7 +18,44 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+def create_tables() -> None:
+    # Порожня БД: створюємо таблиці у вигляді, який мала схема після цієї міграції
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'])
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_table(
+        'contacts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('first_name', sa.String(), nullable=True),
+        sa.Column('last_name', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('phone_number', sa.String(), nullable=True),
+        sa.Column('birthday', sa.Date(), nullable=True),
+        sa.Column('additional_info', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_contacts_id'), 'contacts', ['id'])
+    op.create_index(op.f('ix_contacts_first_name'), 'contacts', ['first_name'])
+    op.create_index(op.f('ix_contacts_last_name'), 'contacts', ['last_name'])
+    op.create_index(op.f('ix_contacts_email'), 'contacts', ['email'], unique=True)
+
+
 def upgrade() -> None:
+    # Схема створюється лише міграціями (без create_all при старті застосунку)
+    if not sa.inspect(op.get_bind()).has_table('contacts'):
+        create_tables()
+        return
+
     # Додаємо стовпець owner_id як nullable
     op.add_column('contacts', sa.Column('created_at', sa.DateTime(), nullable=True))
     op.add_column('contacts', sa.Column('owner_id', sa.Integer(), nullable=True))  # спочатку nullable
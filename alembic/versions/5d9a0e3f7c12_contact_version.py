@@ -0,0 +1,27 @@
+"""Contact version for optimistic concurrency
+
+Revision ID: 5d9a0e3f7c12
+Revises: c41e7d2b5a90
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9a0e3f7c12'
+down_revision: Union[str, None] = 'c41e7d2b5a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Наявні контакти отримують версію 1 через server_default
+    op.add_column('contacts', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    op.drop_column('contacts', 'version')
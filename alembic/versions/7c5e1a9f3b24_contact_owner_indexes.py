@@ -0,0 +1,59 @@
+"""Contact owner-scoped composite indexes
+
+Revision ID: 7c5e1a9f3b24
+Revises: e2b8f4c6a1d3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c5e1a9f3b24'
+down_revision: Union[str, None] = 'e2b8f4c6a1d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Нові індекси: owner_id першим, бо всі запити до контактів обмежені власником
+NEW_INDEXES = [
+    ('ix_contacts_owner_id_id', ['owner_id', 'id'], False),
+    ('ix_contacts_owner_name', ['owner_id', sa.text('lower(last_name)'), sa.text('lower(first_name)')], False),
+    ('ix_contacts_owner_email', ['owner_id', 'email'], True),
+]
+# Старі одностовпцеві індекси (ix_contacts_id дублює первинний ключ, email був унікальним глобально)
+OLD_INDEXES = [
+    ('ix_contacts_id', ['id'], False),
+    ('ix_contacts_first_name', ['first_name'], False),
+    ('ix_contacts_last_name', ['last_name'], False),
+    ('ix_contacts_email', ['email'], True),
+]
+
+
+def _create(indexes) -> None:
+    # У Postgres будуємо CONCURRENTLY, щоб не блокувати запис у таблицю на час побудови
+    concurrently = op.get_bind().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block():
+        for name, columns, unique in indexes:
+            op.create_index(name, 'contacts', columns, unique=unique, postgresql_concurrently=concurrently)
+
+
+def _drop(indexes) -> None:
+    concurrently = op.get_bind().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block():
+        for name, _, _ in indexes:
+            op.drop_index(name, table_name='contacts', postgresql_concurrently=concurrently)
+
+
+def upgrade() -> None:
+    # Спершу нові індекси, потім видалення старих — запити весь час мають індекс
+    _create(NEW_INDEXES)
+    _drop(OLD_INDEXES)
+
+
+def downgrade() -> None:
+    # Повернення глобальної унікальності email не пройде, якщо різні власники вже мають однакові адреси
+    _create(OLD_INDEXES)
+    _drop(NEW_INDEXES)
@@ -0,0 +1,53 @@
+"""Contact search indexes
+
+Revision ID: 8f3c2a1d9b7e
+Revises: 52ede70d4645
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3c2a1d9b7e'
+down_revision: Union[str, None] = '52ede70d4645'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Вираз має збігатися з crud.SEARCH_DOCUMENT
+SEARCH_DOCUMENT = (
+    "to_tsvector('simple', coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, ''))"
+)
+
+
+def upgrade() -> None:
+    # Індекси потрібні лише для Postgres; у SQLite пошук іде через in-memory індекс (search_index.py)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # btree_gin дозволяє мати owner_id у тому ж GIN-індексі, що й триграми
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+
+    # Триграмні індекси для нечіткого пошуку та LIKE 'prefix%' за окремими полями
+    for column in ('first_name', 'last_name', 'email'):
+        op.execute(
+            f'CREATE INDEX IF NOT EXISTS ix_contacts_owner_{column}_trgm '
+            f'ON contacts USING gin (owner_id, lower({column}) gin_trgm_ops)'
+        )
+    # Повнотекстовий індекс для префіксного пошуку за всіма полями
+    op.execute(
+        f'CREATE INDEX IF NOT EXISTS ix_contacts_search_document '
+        f'ON contacts USING gin (owner_id, ({SEARCH_DOCUMENT}))'
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('DROP INDEX IF EXISTS ix_contacts_search_document')
+    for column in ('first_name', 'last_name', 'email'):
+        op.execute(f'DROP INDEX IF EXISTS ix_contacts_owner_{column}_trgm')
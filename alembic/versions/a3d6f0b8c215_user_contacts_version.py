@@ -0,0 +1,27 @@
+"""Per-owner contacts version for response caching
+
+Revision ID: a3d6f0b8c215
+Revises: 7c5e1a9f3b24
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d6f0b8c215'
+down_revision: Union[str, None] = '7c5e1a9f3b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Наявні користувачі починають з версії 0 через server_default
+    op.add_column('users', sa.Column('contacts_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'contacts_version')
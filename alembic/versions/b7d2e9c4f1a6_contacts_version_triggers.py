@@ -0,0 +1,56 @@
+"""Bump users.contacts_version from triggers on contacts
+
+Revision ID: b7d2e9c4f1a6
+Revises: a3d6f0b8c215
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e9c4f1a6'
+down_revision: Union[str, None] = 'a3d6f0b8c215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (подія, рядки, з яких береться owner_id)
+EVENTS = (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD'))
+
+
+def upgrade() -> None:
+    # Версія змінюється тим самим оператором, що й контакти: без окремого UPDATE users з застосунку
+    if op.get_bind().dialect.name == 'postgresql':
+        # Тригер на оператор: один UPDATE users на власника, навіть для вставки тисяч рядків
+        op.execute(
+            'CREATE OR REPLACE FUNCTION bump_contacts_version() RETURNS trigger AS $$ '
+            'BEGIN '
+            'UPDATE users SET contacts_version = contacts_version + 1 '
+            'WHERE id IN (SELECT DISTINCT owner_id FROM changed_contacts); '
+            'RETURN NULL; '
+            'END; $$ LANGUAGE plpgsql'
+        )
+        for event, rows in EVENTS:
+            op.execute(
+                f'CREATE TRIGGER contacts_version_after_{event} AFTER {event.upper()} ON contacts '
+                f'REFERENCING {rows} TABLE AS changed_contacts '
+                f'FOR EACH STATEMENT EXECUTE FUNCTION bump_contacts_version()'
+            )
+        return
+
+    # SQLite підтримує лише тригери на рядок
+    for event, rows in EVENTS:
+        op.execute(
+            f'CREATE TRIGGER contacts_version_after_{event} AFTER {event.upper()} ON contacts '
+            f'BEGIN UPDATE users SET contacts_version = contacts_version + 1 WHERE id = {rows}.owner_id; END'
+        )
+
+
+def downgrade() -> None:
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    for event, _ in EVENTS:
+        op.execute(f'DROP TRIGGER IF EXISTS contacts_version_after_{event}' + (' ON contacts' if postgresql else ''))
+    if postgresql:
+        op.execute('DROP FUNCTION IF EXISTS bump_contacts_version()')
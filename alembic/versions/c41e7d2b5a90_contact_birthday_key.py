@@ -0,0 +1,43 @@
+"""Contact birthday key
+
+Revision ID: c41e7d2b5a90
+Revises: 8f3c2a1d9b7e
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e7d2b5a90'
+down_revision: Union[str, None] = '8f3c2a1d9b7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Місяць і день народження як MMDD (models.birthday_key)
+    op.add_column('contacts', sa.Column('birthday_key', sa.Integer(), nullable=True))
+
+    # Заповнюємо ключ для наявних контактів
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            'UPDATE contacts SET birthday_key = '
+            'EXTRACT(MONTH FROM birthday)::int * 100 + EXTRACT(DAY FROM birthday)::int '
+            'WHERE birthday IS NOT NULL'
+        )
+    else:
+        op.execute(
+            "UPDATE contacts SET birthday_key = CAST(strftime('%m%d', birthday) AS INTEGER) "
+            "WHERE birthday IS NOT NULL"
+        )
+
+    op.create_index('ix_contacts_owner_birthday_key', 'contacts', ['owner_id', 'birthday_key'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_owner_birthday_key', table_name='contacts')
+    op.drop_column('contacts', 'birthday_key')
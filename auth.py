@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from fastapi import HTTPException, Depends, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from jose import JWTError, jwt
+
+import crud
+import revocation
+import user_cache
+from database import DbRunner, get_db_runner
+from user_cache import CurrentUser, TTLCache
+
+logger = logging.getLogger(__name__)
+
+# **JWT-конфігурація**
+SECRET_KEY = "your_secret_key"
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = 30
+
+# Якщо увімкнено, токени містять user_id ("uid") і маршрути не звертаються до БД за користувачем
+AUTH_TRUSTED_TOKENS = os.getenv("AUTH_TRUSTED_TOKENS", "false").lower() == "true"
+
+# **Відкликання токенів**
+# Зберігати відкликання в таблиці revoked_tokens (спільна для воркерів, переживає перезапуск)
+TOKEN_REVOCATION_PERSIST = os.getenv("TOKEN_REVOCATION_PERSIST", "true").lower() == "true"
+# Як часто воркер підтягує з таблиці access-токени, відкликані іншими воркерами
+REVOCATION_SYNC_SECONDS = int(os.getenv("REVOCATION_SYNC_SECONDS", "10"))
+
+# Кеш уже перевірених access-токенів: повторні запити з тим самим токеном не виконують jwt.decode
+CLAIMS_CACHE_TTL = int(os.getenv("CLAIMS_CACHE_TTL", "30"))
+CLAIMS_CACHE_SIZE = int(os.getenv("CLAIMS_CACHE_SIZE", "10000"))
+_claims_cache = TTLCache(maxsize=CLAIMS_CACHE_SIZE, ttl=CLAIMS_CACHE_TTL)
+
+# Токен береться із заголовка "Authorization: Bearer <token>"
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login/")
+
+
+def _create_token(data: dict, expire: datetime, token_type: str) -> str:
+    to_encode = data.copy()
+    # jti — ідентифікатор конкретного токена для відкликання; type не дає видати refresh за access
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": token_type})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+# **Функція для створення токена доступу (access token)**
+def create_access_token(data: dict, expires_delta: timedelta | None = None):
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    return _create_token(data, expire, "access")
+
+
+# **Функція для створення refresh токена**
+def create_refresh_token(data: dict, expires_delta: timedelta | None = None):
+    expire = datetime.utcnow() + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    return _create_token(data, expire, "refresh")
+
+
+# **Дані для токенів користувача**
+def token_claims(user) -> dict:
+    claims = {"sub": user.email}
+    if AUTH_TRUSTED_TOKENS:
+        claims["uid"] = user.id
+    return claims
+
+
+# Дані користувача, які переносяться в нові токени при ротації
+def refresh_claims(payload: dict) -> dict:
+    return {name: payload[name] for name in ("sub", "uid") if name in payload}
+
+
+# **Ідентифікатор токена для відкликання (токени, видані до появи jti, — за хешем)**
+def token_id(token: str, payload: dict) -> str:
+    return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_expires_at(payload: dict) -> datetime:
+    return datetime.utcfromtimestamp(payload["exp"])
+
+
+# **Декодування та перевірка токена**
+def decode_token(token: str, token_type: str = "access") -> dict:
+    detail = "Invalid refresh token" if token_type == "refresh" else "Invalid credentials"
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+    payload = _claims_cache.get(token) if token_type == "access" else None
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise credentials_exception
+        # Токени без "type" видані до ротації і приймаються як будь-який тип
+        if payload.get("sub") is None or payload.get("type", token_type) != token_type:
+            raise credentials_exception
+        if token_type == "access":
+            # Не довше, ніж діє сам токен
+            _claims_cache.set(token, payload, min(CLAIMS_CACHE_TTL, payload["exp"] - time.time()))
+
+    # Відкликання перевіряється лише в пам'яті, без звернення до БД
+    if revocation.is_revoked(token_id(token, payload)):
+        raise credentials_exception
+    return payload
+
+
+# **Відкликання токена в пам'яті воркера; persisted_new — результат вставки в revoked_tokens**
+def mark_revoked(token: str, payload: dict, persisted_new: bool = False) -> bool:
+    _claims_cache.delete(token)
+    revoked_now = revocation.revoke(token_id(token, payload), payload["exp"])
+    # Якщо таблиця ввімкнена, саме вона вирішує, чи токен відкликано вперше (спільна для воркерів)
+    return persisted_new if TOKEN_REVOCATION_PERSIST else revoked_now
+
+
+# **Відкликання токена; False — його вже було відкликано раніше**
+def revoke_token(db: Session, token: str, payload: dict, token_type: str) -> bool:
+    persisted_new = TOKEN_REVOCATION_PERSIST and crud.revoke_token(
+        db, token_id(token, payload), token_type, token_expires_at(payload)
+    )
+    return mark_revoked(token, payload, persisted_new)
+
+
+# **Синхронізація відкликаних access-токенів з таблицею revoked_tokens**
+_synced_at: datetime | None = None
+
+
+def revocation_sync_window() -> tuple[datetime, datetime | None]:
+    # Перекриття на інтервал синхронізації — щоб не пропустити записи, закомічені під час попереднього читання
+    now = datetime.utcnow()
+    since = _synced_at - timedelta(seconds=REVOCATION_SYNC_SECONDS) if _synced_at else None
+    return now, since
+
+
+def apply_revoked_tokens(rows, now: datetime):
+    global _synced_at
+    epoch = datetime(1970, 1, 1)
+    revocation.load((jti, (expires_at - epoch).total_seconds()) for jti, expires_at in rows)
+    _synced_at = now
+
+
+def sync_revoked_tokens(db: Session):
+    now, since = revocation_sync_window()
+    apply_revoked_tokens(crud.get_revoked_tokens(db, "access", now=now, since=since), now)
+    crud.delete_expired_revoked_tokens(db, now)
+
+
+async def revocation_sync_loop(sync_once):
+    # sync_once — корутина, що виконує одну синхронізацію (sync або async сесією)
+    while True:
+        try:
+            await sync_once()
+        except Exception:
+            logger.exception("Revoked tokens sync failed")
+        await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+
+
+# **Користувач без звернення до БД: з довіреного токена або з кешу**
+def resolve_cached_user(payload: dict) -> CurrentUser | None:
+    if AUTH_TRUSTED_TOKENS and isinstance(payload.get("uid"), int):
+        return CurrentUser(id=payload["uid"], email=payload["sub"])
+    return user_cache.get(payload["sub"])
+
+
+# **Функція для отримання поточного користувача (сесія поточного режиму БД з get_db_runner)**
+async def get_current_user(db: DbRunner = Depends(get_db_runner), token: str = Depends(oauth2_scheme)) -> CurrentUser:
+    payload = decode_token(token)
+    user = resolve_cached_user(payload)
+    if user is not None:
+        return user
+
+    db_user = await db.run(crud.get_user_by_email, payload["sub"])
+    if db_user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    return user_cache.put(db_user)
@@ -0,0 +1,92 @@
+# Перевірка вибірки найближчих днів народження: crud.get_upcoming_birthdays (діапазон birthday_key в SQL)
+# проти еталону на Python (crud.next_birthday) для кожного дня високосного та невисокосного року.
+#
+#   python -m benchmarks.birthdays                                  # SQLite у тимчасовій теці
+#   python -m benchmarks.birthdays --database-url postgresql://...  # порожня локальна БД Postgres
+#
+# Контакти — по одному на кожен день року, включно з 29 лютого.
+# Код повернення 1, якщо вибірка чи порядок для якогось дня відрізняються від еталону.
+# Та сама перевірка на SQLite входить у тести: python -m pytest tests/test_birthdays.py
+import argparse
+import sys
+from datetime import date, timedelta
+
+from benchmarks.run import configure_environment, migrate
+
+WINDOWS = (0, 1, 7, 30, 364, 366)
+YEARS = (2027, 2028)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Upcoming birthdays correctness check")
+    parser.add_argument("--database-url", default=None, help="за замовчуванням — SQLite у тимчасовій теці")
+    return parser.parse_args(argv)
+
+
+# **Власник з контактом на кожен день 2000 (високосного) року**
+def seed_birthdays(db, crud, schemas) -> int:
+    user = crud.create_user(db, email="birthdays-check@example.com", hashed_password="-")
+    first = date(2000, 1, 1)
+    contacts = [
+        schemas.ContactCreate(
+            first_name="Birthday",
+            last_name=(first + timedelta(days=offset)).isoformat(),
+            email=f"birthday-{offset}@example.com",
+            phone_number="+380000000000",
+            birthday=first + timedelta(days=offset),
+        )
+        for offset in range(366)
+    ]
+    crud.bulk_create_contacts(db, contacts, user.id)
+    return user.id
+
+
+def expected_ids(crud, contacts, today: date, days: int) -> list[int]:
+    upcoming = [(crud.next_birthday(birthday, today), contact_id) for contact_id, birthday in contacts]
+    if days < 365:
+        upcoming = [item for item in upcoming if (item[0] - today).days <= days]
+    return [contact_id for _, contact_id in sorted(upcoming)]
+
+
+def run_checks() -> list[str]:
+    import crud
+    import database
+    import models
+    import schemas
+
+    migrate()
+    db = database.SessionLocal()
+    try:
+        owner_id = seed_birthdays(db, crud, schemas)
+        contacts = db.query(models.Contact.id, models.Contact.birthday).filter(models.Contact.owner_id == owner_id).all()
+        failures = []
+        for year in YEARS:
+            today = date(year, 1, 1)
+            while today.year == year:
+                for days in WINDOWS:
+                    found = [contact.id for contact in
+                             crud.get_upcoming_birthdays(db, owner_id, days=days, limit=1000, today=today)]
+                    expected = expected_ids(crud, contacts, today, days)
+                    if found != expected:
+                        missing = sorted(set(expected) - set(found))
+                        extra = sorted(set(found) - set(expected))
+                        failures.append(f"{today} days={days}: missing {missing}, extra {extra}"
+                                        + ("" if missing or extra else ", wrong order"))
+                today += timedelta(days=1)
+            print(f"{year}: checked {len(WINDOWS)} windows for every day")
+        return failures
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+    failures = run_checks()
+    for line in failures:
+        print(f"MISMATCH {line}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
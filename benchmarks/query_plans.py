@@ -0,0 +1,145 @@
+# Перевірка планів запитів: ключові запити crud мають іти через індекси власника, а не повним скануванням.
+#
+#   python -m benchmarks.query_plans                                  # SQLite у тимчасовій теці
+#   python -m benchmarks.query_plans --database-url postgresql://...  # порожня локальна БД Postgres
+#
+# Запити не переписуються вручну: функції crud виконуються на засіяній БД, їхні SQL-оператори
+# перехоплюються і для кожного виконується EXPLAIN з тими самими параметрами.
+# Код повернення 1, якщо якийсь запит не використовує очікуваний індекс.
+# Та сама перевірка на SQLite входить у тести: python -m pytest tests/test_query_plans.py
+import argparse
+import random
+import sys
+from datetime import date
+
+from benchmarks.run import configure_environment, seed
+
+PRIMARY_KEY = ("INTEGER PRIMARY KEY", "contacts_pkey")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Query plan regression check")
+    parser.add_argument("--users", type=int, default=3, help="кількість засіяних користувачів")
+    parser.add_argument("--contacts", type=int, default=2000, help="контактів на кожного користувача")
+    parser.add_argument("--database-url", default=None, help="за замовчуванням — SQLite у тимчасовій теці")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+# **Перехоплення SQL, виконаного функцією crud**
+class StatementRecorder:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.statements = []
+        self.recording = False
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.recording and "contacts" in statement and not executemany:
+            self.statements.append((statement, parameters))
+
+    def capture(self, fn) -> list:
+        self.statements = []
+        self.recording = True
+        try:
+            fn()
+        finally:
+            self.recording = False
+        return self.statements
+
+
+def explain(engine, statement: str, parameters) -> str:
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            # На малій тестовій таблиці планувальник може обрати Seq Scan — перевіряємо саму придатність індексу
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).all()
+            return "\n".join(row[0] for row in rows)
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        return "\n".join(row[-1] for row in rows)
+
+
+def full_scan(plan: str) -> bool:
+    # SQLite: "SCAN contacts" без індексу; Postgres: "Seq Scan on contacts"
+    for line in plan.splitlines():
+        line = line.strip()
+        if line == "SCAN contacts" or "Seq Scan on contacts" in line:
+            return True
+    return False
+
+
+# **Перевірки: назва, виклик crud, допустимі індекси, діалекти (None — усі)**
+def build_checks(crud, schemas, owner_id: int, contact_id: int, last_id: int):
+    return [
+        ("contacts_page", lambda db: crud.get_contact_rows_page(db, owner_id, limit=100, after_id=contact_id),
+         ("ix_contacts_owner_id_id",), None),
+        ("contacts_stream", lambda db: list(crud.iter_contact_rows(db, owner_id)), ("ix_contacts_owner_id_id",), None),
+        ("get_contact", lambda db: crud.get_contact_row(db, contact_id, owner_id),
+         ("ix_contacts_owner_id_id", *PRIMARY_KEY), None),
+        ("update_contact", lambda db: crud.update_contact(
+            db, contact_id, schemas.ContactUpdate(additional_info="plan check"), owner_id),
+         ("ix_contacts_owner_id_id", *PRIMARY_KEY), None),
+        ("upcoming_birthdays", lambda db: crud.get_upcoming_birthdays(db, owner_id, days=30, today=date(2024, 6, 1)),
+         ("ix_contacts_owner_birthday_key",), None),
+        ("search_by_name", lambda db: crud.search_contacts(db, owner_id, filters={"last_name": "Shev"}),
+         ("ix_contacts_owner_name", "ix_contacts_owner_last_name_trgm"), ("postgresql",)),
+        ("search_index_load", lambda db: crud.search_contacts(db, owner_id, q="shev"),
+         ("ix_contacts_owner_id_id", "ix_contacts_owner_email", *PRIMARY_KEY), ("sqlite",)),
+        # Пошук старішого контакту з тим самим ім'ям — за (owner_id, lower(last_name), lower(first_name))
+        ("duplicate_contacts", lambda db: crud.delete_duplicate_contacts(db, owner_id, None, last_id, dry_run=True),
+         ("ix_contacts_owner_name",), None),
+    ]
+
+
+def run_checks(args) -> list[str]:
+    import crud
+    import database
+    import models
+    import schemas
+    import search_index
+    from sqlalchemy import func
+
+    seed(args, random.Random(args.seed))
+    engine = database.engine
+    recorder = StatementRecorder(engine)
+    db = database.SessionLocal()
+    try:
+        owner_id, contact_id = db.query(models.Contact.owner_id, models.Contact.id).order_by(models.Contact.id).first()
+        last_id = db.query(func.max(models.Contact.id)).filter(models.Contact.owner_id == owner_id).scalar()
+        failures = []
+        for name, fn, indexes, dialects in build_checks(crud, schemas, owner_id, contact_id, last_id):
+            if dialects is not None and engine.dialect.name not in dialects:
+                continue
+            search_index.invalidate(owner_id)
+            statements = recorder.capture(lambda: fn(db))
+            if not statements:
+                failures.append(f"{name}: no statements captured")
+                continue
+            used_index = False
+            for statement, parameters in statements:
+                plan = explain(engine, statement, parameters)
+                status = "ok"
+                if full_scan(plan):
+                    status = "FULL SCAN"
+                    failures.append(f"{name}: full scan\n    {statement.strip()}\n    {plan}")
+                used_index = used_index or any(index in plan for index in indexes)
+                print(f"{name:<20}{status:<10}{' | '.join(plan.splitlines())}")
+            if not used_index:
+                failures.append(f"{name}: none of {', '.join(indexes)} used")
+        return failures
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+    failures = run_checks(args)
+    for line in failures:
+        print(f"REGRESSION {line}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+# Бенчмарк API контактів: засіває N користувачів × M контактів і ганяє маршрути через ASGI-застосунок у тому ж процесі.
+#
+#   python -m benchmarks.run                         # SQLite у тимчасовій теці, порівняння з benchmarks/baseline.json
+#   python -m benchmarks.run --users 10 --contacts 5000 --requests 500
+#   python -m benchmarks.run --database-url postgresql://...   # порожня локальна БД Postgres
+#   python -m benchmarks.run --save-baseline         # оновити збережений baseline
+#
+# Для кожного маршруту звітує пропускну здатність, p50/p99 затримку та кількість SQL-запитів на запит;
+# сценарій проганяється --repeat разів, для часових показників береться найкращий прогін.
+# Код повернення 1, якщо є регресія відносно baseline: більше SQL-запитів чи помилок на запит, або p50 чи
+# пропускна здатність гірші понад --latency-tolerance і водночас понад --latency-floor мс на запит.
+# p99 лише звітується: на коротких прогонах він залежить від випадкових пауз (GC, планувальник ОС).
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Contacts API benchmark")
+    parser.add_argument("--users", type=int, default=5, help="кількість засіяних користувачів")
+    parser.add_argument("--contacts", type=int, default=2000, help="контактів на кожного користувача")
+    parser.add_argument("--requests", type=int, default=200, help="запитів на кожен маршрут")
+    parser.add_argument("--concurrency", type=int, default=1, help="одночасних запитів")
+    parser.add_argument("--database-url", default=None, help="за замовчуванням — SQLite у тимчасовій теці")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="записати результати як новий baseline")
+    parser.add_argument("--output", type=Path, default=None, help="зберегти результати в JSON")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="прогонів сценарію; затримка й пропускна здатність — з найкращого")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5,
+                        help="допустиме погіршення p50 та пропускної здатності (частка)")
+    parser.add_argument("--latency-floor", type=float, default=2.0,
+                        help="погіршення менше за стільки мс на запит не вважається регресією")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    # Налаштування мають бути встановлені до імпорту модулів застосунку
+    if args.database_url is None:
+        path = Path(tempfile.mkdtemp(prefix="contacts-bench-")) / "bench.db"
+        args.database_url = f"sqlite:///{path}"
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DB_MODE", "sync")
+    # Дешевий bcrypt, щоб register/login не домінували в часі прогону; змінюється через оточення
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    os.environ.setdefault("HASH_POOL_SIZE", "2")
+    # Бенчмарк навмисно шле багато запитів від одного клієнта — ліміти частоти тут лише заважають
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    sys.path.insert(0, str(ROOT))
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+# **Схема БД — тим самим шляхом, що й у продакшені (alembic upgrade head)**
+def migrate():
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, "head")
+
+
+# **Засівання БД напряму через crud (без HTTP)**
+def seed(args, rng):
+    import crud
+    import database
+    import hashing
+    import schemas
+
+    migrate()
+    hashed_password = hashing.hash_password("password")
+    users = []
+    db = database.SessionLocal()
+    try:
+        for user_index in range(args.users):
+            email = f"bench-user-{user_index}@example.com"
+            user = crud.get_user_by_email(db, email) or crud.create_user(db, email=email, hashed_password=hashed_password)
+            contacts = [
+                schemas.ContactCreate(
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    email=f"c{user_index}-{contact_index}@example.com",
+                    phone_number=f"+380{rng.randrange(10 ** 9):09d}",
+                    birthday=date(1970, 1, 1) + timedelta(days=rng.randrange(365 * 40)),
+                )
+                for contact_index in range(args.contacts)
+            ]
+            for start in range(0, len(contacts), 1000):
+                crud.bulk_create_contacts(db, contacts[start:start + 1000], user.id)
+            users.append(email)
+    finally:
+        db.close()
+    return users
+
+
+FIRST_NAMES = ["Ivan", "Olena", "Petro", "Mariia", "Andrii", "Oksana", "Taras", "Iryna", "Dmytro", "Nataliia"]
+LAST_NAMES = ["Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Oliinyk", "Melnyk", "Boiko"]
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+async def run_route(client, counter, name, requests, concurrency, make_request):
+    # Маршрути проганяються по черзі, тож усі SQL-запити фази належать цьому маршруту
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    queries_before = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return name, {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "queries_per_request": round((counter.count - queries_before) / requests, 2),
+    }
+
+
+async def run_benchmark(args):
+    import httpx
+
+    rng = random.Random(args.seed)
+    users = seed(args, rng)
+
+    import database
+    import main
+
+    counter = QueryCounter(database.engine)
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(args.repeat):
+            for route, stats in (await run_scenario(client, counter, args, rng, users)).items():
+                results[route] = best_of(results.get(route), stats)
+    return results
+
+
+# Найкращі час і пропускна здатність з кількох прогонів; запити та помилки — найгірші, бо це жорсткі межі
+def best_of(previous: dict | None, stats: dict) -> dict:
+    if previous is None:
+        return stats
+    return {
+        "requests": stats["requests"],
+        "errors": max(previous["errors"], stats["errors"]),
+        "throughput_rps": max(previous["throughput_rps"], stats["throughput_rps"]),
+        "p50_ms": min(previous["p50_ms"], stats["p50_ms"]),
+        "p99_ms": min(previous["p99_ms"], stats["p99_ms"]),
+        "queries_per_request": max(previous["queries_per_request"], stats["queries_per_request"]),
+    }
+
+
+async def run_scenario(client, counter, args, rng, users) -> dict:
+    results = {}
+    login = await client.post("/login/", params={"email": users[0], "password": "password"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    first_page = await client.get("/contacts/", headers=headers)
+    etag = first_page.headers.get("etag")
+    contact_ids = [contact["id"] for contact in first_page.json()]
+    created_ids = []
+
+    def contact_payload(i):
+        return {
+            "first_name": "Bench", "last_name": f"Created{i}", "email": f"created-{i}-{rng.random()}@example.com",
+            "phone_number": "+380000000000", "birthday": "1990-01-01",
+        }
+
+    async def register(c, i):
+        return await c.post("/register/", params={"email": f"new-{i}-{rng.random()}@example.com", "password": "password"})
+
+    async def login_route(c, i):
+        return await c.post("/login/", params={"email": users[i % len(users)], "password": "password"})
+
+    async def create(c, i):
+        response = await c.post("/contacts/", json=contact_payload(i), headers=headers)
+        if response.status_code < 400:
+            created_ids.append(response.json()["id"])
+        return response
+
+    async def list_page(c, i):
+        return await c.get("/contacts/", params={"limit": 100}, headers=headers)
+
+    async def list_not_modified(c, i):
+        return await c.get("/contacts/", headers={**headers, "If-None-Match": etag or ""})
+
+    async def stream_all(c, i):
+        # Потік не кешується: щоразу читає і серіалізує всі контакти користувача
+        return await c.get("/contacts/", params={"stream": "true"}, headers=headers)
+
+    async def get_one(c, i):
+        return await c.get(f"/contacts/{contact_ids[i % len(contact_ids)]}", headers=headers)
+
+    async def update(c, i):
+        return await c.put(f"/contacts/{created_ids[i % len(created_ids)]}", json={"additional_info": str(i)}, headers=headers)
+
+    async def search(c, i):
+        return await c.get("/contacts/search", params={"q": rng.choice(LAST_NAMES)[:3]}, headers=headers)
+
+    async def birthdays(c, i):
+        return await c.get("/contacts/birthdays", params={"days": 30}, headers=headers)
+
+    async def delete(c, i):
+        return await c.delete(f"/contacts/{created_ids[i]}", headers=headers)
+
+    scenario = [
+        ("register", register), ("login", login_route), ("create_contact", create),
+        ("list_contacts", list_page), ("list_contacts_304", list_not_modified),
+        ("stream_contacts", stream_all), ("get_contact", get_one),
+        ("update_contact", update), ("search_contacts", search), ("upcoming_birthdays", birthdays),
+        ("delete_contact", delete),
+    ]
+    for name, make_request in scenario:
+        requests = min(args.requests, len(created_ids)) if name == "delete_contact" else args.requests
+        route, stats = await run_route(client, counter, name, requests, args.concurrency, make_request)
+        results[route] = stats
+    return results
+
+
+# **Порівняння з baseline**
+def compare(results: dict, baseline: dict, tolerance: float, floor_ms: float = 2.0) -> list[str]:
+    regressions = []
+    for route, stats in results.items():
+        base = baseline.get(route)
+        if base is None:
+            continue
+        # Жорсткі межі: кількість SQL-запитів і помилок не залежить від шуму вимірювань
+        if stats["queries_per_request"] > base["queries_per_request"]:
+            regressions.append(f"{route}: queries/request {base['queries_per_request']} -> {stats['queries_per_request']}")
+        if stats["errors"] > base["errors"]:
+            regressions.append(f"{route}: errors {base['errors']} -> {stats['errors']}")
+        # Час — лише якщо погіршення і відносно, і в абсолютних мілісекундах на запит
+        slower_ms = stats["p50_ms"] - base["p50_ms"]
+        if stats["p50_ms"] > base["p50_ms"] * (1 + tolerance) and slower_ms >= floor_ms:
+            regressions.append(f"{route}: p50 {base['p50_ms']}ms -> {stats['p50_ms']}ms")
+        slower_ms = 1000 / stats["throughput_rps"] - 1000 / base["throughput_rps"]
+        if stats["throughput_rps"] < base["throughput_rps"] * (1 - tolerance) and slower_ms >= floor_ms:
+            regressions.append(f"{route}: throughput {base['throughput_rps']} -> {stats['throughput_rps']} req/s")
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"{'route':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'queries':>9}{'errors':>8}")
+    for route, stats in results.items():
+        print(f"{route:<22}{stats['throughput_rps']:>10}{stats['p50_ms']:>10}{stats['p99_ms']:>10}"
+              f"{stats['queries_per_request']:>9}{stats['errors']:>8}")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+    results = asyncio.run(run_benchmark(args))
+    print_table(results)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print("No baseline to compare against")
+        return 0
+
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.latency_tolerance, args.latency_floor)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+import csv
+import io
+import json
+import os
+
+from pydantic import ValidationError
+from sqlalchemy import insert, delete
+from sqlalchemy.exc import IntegrityError
+
+import crud
+import models
+import schemas
+import serialization
+
+# **Налаштування масового імпорту/експорту**
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "500"))
+BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "1000"))
+
+CONTACT_FIELDS = schemas.CONTACT_FIELDS
+
+
+# **Звіт про імпорт**
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line: int, error):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def as_dict(self) -> dict:
+        return {"inserted": self.inserted, "failed": self.failed, "errors": self.errors}
+
+
+def _decode_line(line: bytes) -> str | None:
+    try:
+        return line.decode("utf-8-sig", errors="strict").rstrip("\r")
+    except UnicodeDecodeError:
+        return None
+
+
+# **Читання тіла запиту порядково, без завантаження всього файлу в пам'ять; None — рядок не в UTF-8**
+async def iter_lines(byte_stream):
+    buffer = b""
+    async for chunk in byte_stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield _decode_line(line)
+    if buffer:
+        yield _decode_line(buffer)
+
+
+# **Записи (номер рядка, dict або текст помилки) з CSV чи NDJSON**
+async def read_records(byte_stream, fmt: str):
+    header = None
+    pending = ""
+    pending_line = 0
+    line_no = 0
+    async for line in iter_lines(byte_stream):
+        line_no += 1
+        if line is None:
+            # Незакритий запис CSV, що містить цей рядок, відкидаємо разом із ним
+            yield (pending_line if pending else line_no), "Invalid UTF-8"
+            pending = ""
+            continue
+        if fmt == "ndjson":
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield line_no, f"Invalid JSON: {exc}"
+                continue
+            yield line_no, record if isinstance(record, dict) else "Expected a JSON object"
+            continue
+
+        # CSV: поле в лапках може містити перенесення рядка — збираємо запис, доки лапки не закриються
+        if not pending:
+            pending_line = line_no
+            pending = line
+        else:
+            pending += "\n" + line
+        if pending.count('"') % 2:
+            continue
+        record_text, pending = pending, ""
+        if not record_text.strip():
+            continue
+        values = next(csv.reader(io.StringIO(record_text)))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield pending_line, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Порожні комірки CSV вважаємо відсутніми значеннями
+        yield pending_line, {name: value for name, value in zip(header, values) if value != ""}
+
+    if pending:
+        yield pending_line, "Unterminated quoted field"
+
+
+# Помилки валідації як рядки "поле: повідомлення" (сирі exc.errors() містять винятки, які не серіалізуються в JSON)
+def validation_errors(exc: ValidationError) -> list[str]:
+    return [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors()]
+
+
+# **Валідація та вставка однієї пачки записів**
+def import_batch(db, batch, owner_id: int, report: ImportReport):
+    lines = []
+    contacts = []
+    for line, record in batch:
+        if isinstance(record, str):
+            report.add_error(line, record)
+            continue
+        try:
+            contact = schemas.ContactCreate(**record)
+        except ValidationError as exc:
+            report.add_error(line, validation_errors(exc))
+            continue
+        lines.append(line)
+        contacts.append(contact)
+
+    failed = crud.bulk_create_contacts(db, contacts, owner_id)
+    for index, error in failed:
+        report.add_error(lines[index], error)
+    report.inserted += len(contacts) - len(failed)
+
+
+# **Потоковий експорт контактів у CSV або NDJSON; contacts — dict-рядки (crud.iter_contact_rows)**
+def export_contacts(contacts, fmt: str):
+    chunk = []
+    header = True
+    for contact in contacts:
+        chunk.append(contact)
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield encode_contacts(chunk, fmt, header)
+            chunk, header = [], False
+    if chunk or (header and fmt == "csv"):
+        yield encode_contacts(chunk, fmt, header)
+
+
+# Те саме для режиму DB_MODE=async: contacts — асинхронний ітератор (crud.iter_contact_rows_async)
+async def export_contacts_async(contacts, fmt: str):
+    chunk = []
+    header = True
+    async for contact in contacts:
+        chunk.append(contact)
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield encode_contacts(chunk, fmt, header)
+            chunk, header = [], False
+    if chunk or (header and fmt == "csv"):
+        yield encode_contacts(chunk, fmt, header)
+
+
+def encode_contacts(chunk: list[dict], fmt: str, header: bool):
+    if fmt == "ndjson":
+        return b"".join(serialization.dumps(contact) + b"\n" for contact in chunk)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CONTACT_FIELDS)
+    if header:
+        writer.writeheader()
+    writer.writerows(chunk)
+    return buffer.getvalue()
+
+
+# **Пакетні зміни контактів**
+class BatchAborted(Exception):
+    pass
+
+
+def _result(index: int, operation, status: int, contact=None, error=None) -> dict:
+    return {
+        "index": index,
+        "op": operation.op,
+        "status": status,
+        "id": contact["id"] if contact else operation.id,
+        "contact": contact,
+        "error": error,
+    }
+
+
+def _prepare(operation, owner_id: int):
+    # Валідація даних операції до будь-яких звернень до БД
+    if operation.op == "create":
+        contact = schemas.ContactCreate(**(operation.data or {}))
+        return dict(contact.dict(), birthday_key=models.birthday_key(contact.birthday), owner_id=owner_id)
+    if operation.id is None:
+        raise ValueError("id is required")
+    if operation.op == "update":
+        return crud.contact_update_values(schemas.ContactUpdate(**(operation.data or {})))
+    return None
+
+
+def _groups(prepared):
+    # Послідовні create та delete без версії об'єднуємо в один оператор, решту виконуємо по одній
+    group = []
+    for item in prepared:
+        _, operation, _ = item
+        groupable = operation.op == "create" or (operation.op == "delete" and operation.version is None)
+        if group and groupable and group[0][1].op == operation.op:
+            group.append(item)
+            continue
+        if group:
+            yield group
+        group = [item]
+        if not groupable:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def _apply_creates(db, group, results):
+    rows = [payload for _, _, payload in group]
+    stmt = insert(models.Contact).returning(models.Contact, sort_by_parameter_order=True)
+    contacts = db.execute(stmt, rows).scalars().all()
+    for (index, operation, _), contact in zip(group, contacts):
+        results[index] = _result(index, operation, 201, contact=schemas.contact_to_dict(contact))
+
+
+def _apply_deletes(db, owner_id: int, group, results) -> bool:
+    ids = [operation.id for _, operation, _ in group]
+    stmt = delete(models.Contact).where(models.Contact.owner_id == owner_id, models.Contact.id.in_(ids))
+    deleted = set(db.execute(stmt.returning(models.Contact.id).execution_options(synchronize_session=False)).scalars())
+    ok = True
+    for index, operation, _ in group:
+        if operation.id in deleted:
+            deleted.discard(operation.id)
+            results[index] = _result(index, operation, 200)
+        else:
+            results[index] = _result(index, operation, 404, error="Contact not found")
+            ok = False
+    return ok
+
+
+def _apply_single(db, owner_id: int, index: int, operation, payload, results) -> bool:
+    if operation.op == "update":
+        stmt = crud.update_contact_statement(operation.id, owner_id, payload, operation.version)
+        contact = db.execute(stmt).scalars().first()
+        if contact is not None:
+            results[index] = _result(index, operation, 200, contact=schemas.contact_to_dict(contact))
+            return True
+    else:
+        stmt = crud.delete_contact_statement(operation.id, owner_id, operation.version)
+        if db.execute(stmt).scalar() is not None:
+            results[index] = _result(index, operation, 200)
+            return True
+
+    if operation.version is not None and crud.contact_exists(db, operation.id, owner_id):
+        results[index] = _result(index, operation, 409, error="Contact was modified, reload and retry")
+    else:
+        results[index] = _result(index, operation, 404, error="Contact not found")
+    return False
+
+
+def _apply_group(db, owner_id: int, group, results) -> bool:
+    operation = group[0][1]
+    if operation.op == "create":
+        _apply_creates(db, group, results)
+        return True
+    if operation.op == "delete" and operation.version is None:
+        return _apply_deletes(db, owner_id, group, results)
+    index, operation, payload = group[0]
+    return _apply_single(db, owner_id, index, operation, payload, results)
+
+
+def _apply_group_isolated(db, owner_id: int, group, results):
+    # per_item: кожна група у власному savepoint; невдалу пачку create повторюємо по одній
+    try:
+        with db.begin_nested():
+            _apply_group(db, owner_id, group, results)
+        return
+    except IntegrityError as exc:
+        if len(group) == 1:
+            index, operation, _ = group[0]
+            results[index] = _result(index, operation, 409, error=str(exc.orig))
+            return
+    for item in group:
+        _apply_group_isolated(db, owner_id, [item], results)
+
+
+def apply_batch(db, owner_id: int, request: schemas.ContactBatchRequest) -> dict:
+    atomic = request.mode == "atomic"
+    results = [None] * len(request.operations)
+    prepared = []
+    for index, operation in enumerate(request.operations):
+        try:
+            prepared.append((index, operation, _prepare(operation, owner_id)))
+        except ValidationError as exc:
+            results[index] = _result(index, operation, 422, error=validation_errors(exc))
+        except ValueError as exc:
+            results[index] = _result(index, operation, 422, error=str(exc))
+
+    try:
+        if atomic and len(prepared) < len(request.operations):
+            raise BatchAborted()
+        for group in _groups(prepared):
+            if not atomic:
+                _apply_group_isolated(db, owner_id, group, results)
+                continue
+            try:
+                ok = _apply_group(db, owner_id, group, results)
+            except IntegrityError as exc:
+                for index, operation, _ in group:
+                    results[index] = _result(index, operation, 409, error=str(exc.orig))
+                ok = False
+            if not ok:
+                raise BatchAborted()
+    except BatchAborted:
+        # Все або нічого: відкочуємо транзакцію, успішні операції позначаємо як незастосовані
+        db.rollback()
+        for index, operation in enumerate(request.operations):
+            if results[index] is None or results[index]["status"] < 400:
+                results[index] = _result(index, operation, 424, error="Not applied: batch aborted")
+        return {"mode": request.mode, "applied": False, "results": results}
+
+    db.commit()
+    crud.contacts_changed(owner_id)
+    return {"mode": request.mode, "applied": True, "results": results}
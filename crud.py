@@ -1,6 +1,69 @@
-from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, or_, case, insert, update, delete, literal_column, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
 import models
 import schemas
+import user_cache
+import search_index
+
+
+# **Версія контактів власника (в БД, тож спільна для всіх воркерів)**
+# Збільшується тригерами на contacts (міграція b7d2e9c4f1a6) в тому ж операторі, що й зміна контактів
+def get_contacts_version(db: Session, owner_id: int) -> int:
+    return db.execute(select(models.User.contacts_version).where(models.User.id == owner_id)).scalar() or 0
+
+
+# **Скидання локальних похідних кешів після зміни контактів власника**
+def contacts_changed(owner_id: int):
+    search_index.invalidate(owner_id)
+
+
+def get_user_by_email(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+
+def create_user(db: Session, email: str, hashed_password: str):
+    db_user = models.User(email=email, hashed_password=hashed_password)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    user_cache.invalidate(email)
+    return db_user
+
+
+def update_user_password(db: Session, user: models.User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+    user_cache.invalidate(user.email)
+    return user
+
+
+# **Відкликані токени**
+def revoke_token(db: Session, jti: str, token_type: str, expires_at: datetime) -> bool:
+    # False — токен уже відкликано (наприклад, refresh-токен ротовано іншим запитом чи воркером)
+    db.add(models.RevokedToken(jti=jti, token_type=token_type, expires_at=expires_at))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+
+def get_revoked_tokens(db: Session, token_type: str, now: datetime, since: datetime | None = None):
+    query = db.query(models.RevokedToken.jti, models.RevokedToken.expires_at).filter(
+        models.RevokedToken.token_type == token_type, models.RevokedToken.expires_at > now
+    )
+    if since is not None:
+        query = query.filter(models.RevokedToken.revoked_at >= since)
+    return query.all()
+
+
+def delete_expired_revoked_tokens(db: Session, now: datetime) -> int:
+    deleted = db.query(models.RevokedToken).filter(models.RevokedToken.expires_at <= now).delete(synchronize_session=False)
+    db.commit()
+    return deleted
 
 
 # Створення нового контакту
@@ -11,12 +74,19 @@ def create_contact(db: Session, contact: schemas.ContactCreate, owner_id: int):
         email=contact.email,
         phone_number=contact.phone_number,
         birthday=contact.birthday,
+        birthday_key=models.birthday_key(contact.birthday),
         additional_info=contact.additional_info,
         owner_id=owner_id  # Призначаємо власника контакту
     )
     db.add(db_contact)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Email уже є в іншого контакту власника (ix_contacts_owner_email) — маршрут відповідає 409
+        db.rollback()
+        raise
     db.refresh(db_contact)
+    contacts_changed(owner_id)
     return db_contact
 
 
@@ -25,37 +95,343 @@ def get_contacts(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
     return db.query(models.Contact).filter(models.Contact.owner_id == owner_id).offset(skip).limit(limit).all()
 
 
-# Отримання контакту за id для поточного користувача
-def get_contact(db: Session, contact_id: int, owner_id: int):
-    return db.query(models.Contact).filter(models.Contact.id == contact_id, models.Contact.owner_id == owner_id).first()
-
-
-# Оновлення контакту
-def update_contact(db: Session, contact_id: int, contact: schemas.ContactUpdate, owner_id: int):
-    db_contact = db.query(models.Contact).filter(models.Contact.id == contact_id, models.Contact.owner_id == owner_id).first()
-    if db_contact:
-        if contact.first_name:
-            db_contact.first_name = contact.first_name
-        if contact.last_name:
-            db_contact.last_name = contact.last_name
-        if contact.email:
-            db_contact.email = contact.email
-        if contact.phone_number:
-            db_contact.phone_number = contact.phone_number
-        if contact.birthday:
-            db_contact.birthday = contact.birthday
-        if contact.additional_info:
-            db_contact.additional_info = contact.additional_info
+# Масове створення контактів (імпорт)
+def bulk_create_contacts(db: Session, contacts: list[schemas.ContactCreate], owner_id: int) -> list[tuple[int, str]]:
+    # Одна багаторядкова вставка на пачку; повертає (індекс, помилка) для рядків, що не вставились
+    rows = [
+        dict(contact.dict(), birthday_key=models.birthday_key(contact.birthday), owner_id=owner_id)
+        for contact in contacts
+    ]
+    if not rows:
+        return []
 
+    failed = []
+    try:
+        db.execute(insert(models.Contact), rows)
         db.commit()
-        db.refresh(db_contact)
-    return db_contact
+    except IntegrityError:
+        # Пачка не пройшла (наприклад, дублікат email) — вставляємо по рядку в savepoint, щоб знайти винні
+        db.rollback()
+        for index, row in enumerate(rows):
+            try:
+                with db.begin_nested():
+                    db.execute(insert(models.Contact), [row])
+            except IntegrityError as exc:
+                failed.append((index, str(exc.orig)))
+        db.commit()
+    contacts_changed(owner_id)
+    return failed
 
 
-# Видалення контакту
-def delete_contact(db: Session, contact_id: int, owner_id: int):
-    db_contact = db.query(models.Contact).filter(models.Contact.id == contact_id, models.Contact.owner_id == owner_id).first()
-    if db_contact:
-        db.delete(db_contact)
-        db.commit()
+# **Читання для відповідей: кортежі стовпців замість ORM-об'єктів (без identity map і відстеження змін)**
+CONTACT_COLUMNS = tuple(getattr(models.Contact, name) for name in schemas.CONTACT_FIELDS)
+
+
+def contact_rows_query(owner_id: int, after_id: int | None = None):
+    # Keyset-пагінація по (owner_id, id): без OFFSET, тож час не залежить від номера сторінки
+    query = select(*CONTACT_COLUMNS).where(models.Contact.owner_id == owner_id)
+    if after_id is not None:
+        query = query.where(models.Contact.id > after_id)
+    return query.order_by(models.Contact.id)
+
+
+def get_contact_rows_page(db: Session, owner_id: int, limit: int = 100, after_id: int | None = None) -> list[dict]:
+    rows = db.execute(contact_rows_query(owner_id, after_id).limit(limit))
+    return [schemas.contact_row_to_dict(row) for row in rows]
+
+
+def iter_contact_rows(db: Session, owner_id: int, after_id: int | None = None, chunk_size: int = 1000):
+    result = db.execute(contact_rows_query(owner_id, after_id).execution_options(yield_per=chunk_size))
+    for row in result:
+        yield schemas.contact_row_to_dict(row)
+
+
+# Те саме для режиму DB_MODE=async: потік рядків через AsyncSession.stream (run_sync не віддає рядки частинами)
+async def iter_contact_rows_async(db, owner_id: int, after_id: int | None = None, chunk_size: int = 1000):
+    result = await db.stream(contact_rows_query(owner_id, after_id).execution_options(yield_per=chunk_size))
+    async for row in result:
+        yield schemas.contact_row_to_dict(row)
+
+
+# Отримання контакту за id для поточного користувача
+def get_contact_row(db: Session, contact_id: int, owner_id: int) -> dict | None:
+    row = db.execute(
+        select(*CONTACT_COLUMNS).where(models.Contact.id == contact_id, models.Contact.owner_id == owner_id)
+    ).first()
+    return schemas.contact_row_to_dict(row) if row is not None else None
+
+
+def contact_exists(db: Session, contact_id: int, owner_id: int) -> bool:
+    return db.query(models.Contact.id).filter(models.Contact.id == contact_id, models.Contact.owner_id == owner_id).first() is not None
+
+
+# Значення для часткового оновлення: лише передані поля, явний null очищує поле
+def contact_update_values(contact: schemas.ContactUpdate) -> dict:
+    values = contact.dict(exclude_unset=True)
+    if "birthday" in values:
+        values["birthday_key"] = models.birthday_key(values["birthday"])
+    return values
+
+
+def update_contact_statement(contact_id: int, owner_id: int, values: dict, expected_version: int | None = None):
+    stmt = update(models.Contact).where(models.Contact.id == contact_id, models.Contact.owner_id == owner_id)
+    if expected_version is not None:
+        stmt = stmt.where(models.Contact.version == expected_version)
+    return (
+        stmt.values(**values, version=models.Contact.version + 1)
+        .returning(models.Contact)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+
+def delete_contact_statement(contact_id: int, owner_id: int, expected_version: int | None = None):
+    stmt = delete(models.Contact).where(models.Contact.id == contact_id, models.Contact.owner_id == owner_id)
+    if expected_version is not None:
+        stmt = stmt.where(models.Contact.version == expected_version)
+    return stmt.returning(models.Contact.id).execution_options(synchronize_session=False)
+
+
+# Оновлення контакту одним UPDATE ... RETURNING; None — контакт не знайдено або версія не збіглась
+def update_contact(db: Session, contact_id: int, contact: schemas.ContactUpdate, owner_id: int,
+                   expected_version: int | None = None):
+    stmt = update_contact_statement(contact_id, owner_id, contact_update_values(contact), expected_version)
+    try:
+        db_contact = db.execute(stmt).scalars().first()
+    except IntegrityError:
+        db.rollback()
+        raise
+    if db_contact is None:
+        db.rollback()
+        return None
+    # Від'єднуємо об'єкт, щоб commit не зробив його застарілим і не спричинив повторний SELECT
+    db.expunge(db_contact)
+    db.commit()
+    contacts_changed(owner_id)
     return db_contact
+
+
+# Видалення контакту одним DELETE ... RETURNING; повертає id видаленого контакту
+def delete_contact(db: Session, contact_id: int, owner_id: int, expected_version: int | None = None):
+    deleted_id = db.execute(delete_contact_statement(contact_id, owner_id, expected_version)).scalar()
+    if deleted_id is None:
+        db.rollback()
+        return None
+    db.commit()
+    contacts_changed(owner_id)
+    return deleted_id
+
+
+# **Пошук контактів**
+SEARCH_COLUMNS = (models.Contact.first_name, models.Contact.last_name, models.Contact.email)
+
+# Вираз має збігатися з виразом GIN-індексу ix_contacts_search_document (міграція 8f3c2a1d9b7e)
+SEARCH_DOCUMENT = func.to_tsvector(
+    literal_column("'simple'"),
+    func.coalesce(models.Contact.first_name, literal_column("''"))
+    .op("||")(literal_column("' '"))
+    .op("||")(func.coalesce(models.Contact.last_name, literal_column("''")))
+    .op("||")(literal_column("' '"))
+    .op("||")(func.coalesce(models.Contact.email, literal_column("''"))),
+)
+
+
+def _like_prefix(value: str) -> str:
+    escaped = value.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def _prefix_tsquery(q: str) -> str | None:
+    # Кожне слово — окремий префіксний лексем: 'іва':* & 'пет':*
+    terms = [term.replace("\\", "").replace("'", "") for term in q.lower().split()]
+    terms = [term for term in terms if term]
+    if not terms:
+        return None
+    return " & ".join(f"'{term}':*" for term in terms)
+
+
+def search_contacts(db: Session, owner_id: int, q: str | None = None, filters: dict | None = None,
+                    fuzzy: bool = False, limit: int = 50):
+    filters = {name: value for name, value in (filters or {}).items() if value}
+    if db.bind.dialect.name == "postgresql":
+        return _search_contacts_postgres(db, owner_id, q, filters, fuzzy, limit)
+    return _search_contacts_in_memory(db, owner_id, q, filters, fuzzy, limit)
+
+
+def _search_contacts_postgres(db: Session, owner_id: int, q, filters: dict, fuzzy: bool, limit: int):
+    query = db.query(models.Contact).filter(models.Contact.owner_id == owner_id)
+    for name, value in filters.items():
+        query = query.filter(func.lower(getattr(models.Contact, name)).like(_like_prefix(value), escape="\\"))
+
+    if q and fuzzy:
+        # Нечіткий пошук через pg_trgm: оператор % використовує GIN-індекси gin_trgm_ops
+        term = q.lower()
+        query = query.filter(or_(*[func.lower(column).op("%")(term) for column in SEARCH_COLUMNS]))
+        score = func.greatest(*[func.similarity(func.lower(column), term) for column in SEARCH_COLUMNS])
+        return query.order_by(score.desc(), models.Contact.id).limit(limit).all()
+
+    if q:
+        tsquery = _prefix_tsquery(q)
+        if tsquery is None:
+            return []
+        query = query.filter(SEARCH_DOCUMENT.op("@@")(func.to_tsquery(literal_column("'simple'"), tsquery)))
+
+    return query.order_by(
+        func.lower(models.Contact.last_name), func.lower(models.Contact.first_name), models.Contact.id
+    ).limit(limit).all()
+
+
+def _search_contacts_in_memory(db: Session, owner_id: int, q, filters: dict, fuzzy: bool, limit: int):
+    index = search_index.get_index(
+        owner_id,
+        lambda: db.query(models.Contact.id, *SEARCH_COLUMNS).filter(models.Contact.owner_id == owner_id).all(),
+    )
+
+    if q and fuzzy:
+        ids = [contact_id for _, contact_id in index.fuzzy(q)]
+    else:
+        ids = index.prefix(q) if q else index.all_ids()
+        ids = sorted(ids, key=index.sort_key)
+    ids = index.filter_fields(ids, filters)[:limit]
+    if not ids:
+        return []
+
+    contacts = db.query(models.Contact).filter(models.Contact.owner_id == owner_id, models.Contact.id.in_(ids)).all()
+    position = {contact_id: i for i, contact_id in enumerate(ids)}
+    return sorted(contacts, key=lambda contact: position[contact.id])
+
+
+# **Найближчі дні народження**
+def next_birthday(birthday: date, today: date) -> date:
+    # 29 лютого в невисокосний рік святкуємо 1 березня (відповідає порядку ключів 0229 < 0301)
+    for year in (today.year, today.year + 1):
+        try:
+            candidate = birthday.replace(year=year)
+        except ValueError:
+            candidate = date(year, 3, 1)
+        if candidate >= today:
+            return candidate
+
+
+FEB_29 = date(2000, 2, 29)
+FEB_29_KEY = models.birthday_key(FEB_29)
+
+
+def birthday_range_filter(today: date, days: int):
+    # Умова "день народження в найближчі days днів" за birthday_key (None — підходить будь-який)
+    start_key = models.birthday_key(today)
+    end_key = models.birthday_key(today + timedelta(days=days))
+    key = models.Contact.birthday_key
+    if days >= 365:
+        return None
+    if start_key <= end_key:
+        in_range = key.between(start_key, end_key)
+    else:
+        # Діапазон переходить через кінець року
+        in_range = or_(key >= start_key, key <= end_key)
+    if (next_birthday(FEB_29, today) - today).days <= days:
+        # У невисокосний рік 0229 святкується 1 березня, а вікно може починатися саме з нього
+        in_range = or_(in_range, key == FEB_29_KEY)
+    return in_range
+
+
+def birthday_order(today: date) -> tuple:
+    # (рік: 0 — поточний, 1 — наступний; ключ дня) для ORDER BY, з 0229 на місці фактичної дати святкування
+    key = models.Contact.birthday_key
+    feb_29 = next_birthday(FEB_29, today)
+    year = case((key == FEB_29_KEY, int(feb_29.year > today.year)), (key >= models.birthday_key(today), 0), else_=1)
+    day = case((key == FEB_29_KEY, models.birthday_key(feb_29)), else_=key)
+    return year, day
+
+
+def get_upcoming_birthdays(db: Session, owner_id: int, days: int = 7, skip: int = 0, limit: int = 100,
+                           today: date | None = None):
+    today = today or date.today()
+    key = models.Contact.birthday_key
+
+    query = db.query(models.Contact).filter(models.Contact.owner_id == owner_id, key.isnot(None))
+    in_range = birthday_range_filter(today, days)
+    if in_range is not None:
+        query = query.filter(in_range)
+
+    # Спочатку дні народження до кінця року, потім — з початку наступного
+    return query.order_by(*birthday_order(today), models.Contact.id).offset(skip).limit(limit).all()
+
+
+# **Обслуговування контактів порціями (фонові задачі jobs.py)**
+# Порція — діапазон id (after_id, last_id] власника; межі беруться keyset-запитом по (owner_id, id)
+def count_contacts(db: Session, owner_id: int, after_id: int | None = None) -> int:
+    query = db.query(func.count(models.Contact.id)).filter(models.Contact.owner_id == owner_id)
+    if after_id is not None:
+        query = query.filter(models.Contact.id > after_id)
+    return query.scalar()
+
+
+def next_contacts_chunk(db: Session, owner_id: int, after_id: int | None, limit: int) -> tuple[int | None, int]:
+    # (останній id порції, кількість контактів у ній); (None, 0) — контакти закінчились
+    query = select(models.Contact.id).where(models.Contact.owner_id == owner_id)
+    if after_id is not None:
+        query = query.where(models.Contact.id > after_id)
+    ids = db.execute(query.order_by(models.Contact.id).limit(limit)).scalars().all()
+    return (ids[-1], len(ids)) if ids else (None, 0)
+
+
+def _chunk_filter(owner_id: int, after_id: int | None, last_id: int):
+    conditions = [models.Contact.owner_id == owner_id, models.Contact.id <= last_id]
+    if after_id is not None:
+        conditions.append(models.Contact.id > after_id)
+    return conditions
+
+
+def recompute_birthday_keys(db: Session, owner_id: int, after_id: int | None, last_id: int) -> int:
+    rows = db.execute(
+        select(models.Contact.id, models.Contact.birthday, models.Contact.birthday_key)
+        .where(*_chunk_filter(owner_id, after_id, last_id))
+    ).all()
+    changed = [
+        {"id": contact_id, "birthday_key": models.birthday_key(birthday)}
+        for contact_id, birthday, key in rows
+        if models.birthday_key(birthday) != key
+    ]
+    if changed:
+        # Масовий UPDATE за первинним ключем одним executemany
+        db.execute(update(models.Contact), changed)
+    db.commit()
+    return len(changed)
+
+
+def _duplicate_of_older_contact():
+    # Дублікат — контакт з тими самими ім'ям, прізвищем і телефоном, що й старіший (менший id) контакт власника
+    older = aliased(models.Contact)
+    return (
+        select(older.id)
+        .where(
+            older.owner_id == models.Contact.owner_id,
+            func.lower(older.last_name) == func.lower(models.Contact.last_name),
+            func.lower(older.first_name) == func.lower(models.Contact.first_name),
+            func.coalesce(older.phone_number, "") == func.coalesce(models.Contact.phone_number, ""),
+            older.id < models.Contact.id,
+        )
+        .exists()
+    )
+
+
+def delete_duplicate_contacts(db: Session, owner_id: int, after_id: int | None, last_id: int,
+                              dry_run: bool = False) -> int:
+    conditions = [*_chunk_filter(owner_id, after_id, last_id), _duplicate_of_older_contact()]
+    if dry_run:
+        return db.query(func.count(models.Contact.id)).filter(*conditions).scalar()
+
+    deleted = db.execute(delete(models.Contact).where(*conditions).execution_options(synchronize_session=False)).rowcount
+    db.commit()
+    if deleted:
+        contacts_changed(owner_id)
+    return deleted
+
+
+def get_birthday_contacts_chunk(db: Session, owner_id: int, after_id: int | None, last_id: int,
+                                today: date, days: int) -> list[dict]:
+    query = select(*CONTACT_COLUMNS).where(*_chunk_filter(owner_id, after_id, last_id), models.Contact.birthday_key.isnot(None))
+    in_range = birthday_range_filter(today, days)
+    if in_range is not None:
+        query = query.where(in_range)
+    return [schemas.contact_row_to_dict(row) for row in db.execute(query.order_by(models.Contact.id))]
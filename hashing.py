@@ -0,0 +1,105 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+
+# **Хешування паролів**
+# Хеші з іншою вартістю, ніж BCRYPT_ROUNDS, перехешовуються при наступному вході
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# Кількість процесів для bcrypt (0 — хешувати в поточному потоці)
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", "2"))
+# Скільки задач може чекати в черзі понад зайняті процеси, перш ніж відповідати 503
+HASH_QUEUE_DEPTH = int(os.getenv("HASH_QUEUE_DEPTH", "32"))
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_POOL_SIZE + HASH_QUEUE_DEPTH)
+
+
+# Функції, що виконуються в дочірніх процесах
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=HASH_POOL_SIZE)
+    return _executor
+
+
+def _submit(fn, *args) -> Future:
+    # Якщо черга заповнена — одразу відмовляємо, а не накопичуємо запити
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many password operations, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    if HASH_POOL_SIZE <= 0:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        finally:
+            _slots.release()
+        return future
+
+    try:
+        future = _get_executor().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+# **Хешування пароля**
+def hash_password(password: str) -> str:
+    return _submit(_hash, password).result()
+
+
+# **Перевірка пароля; повертає (валідний, новий хеш або None)**
+def verify_password(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return _submit(_verify_and_update, password, hashed_password).result()
+
+
+# Без пулу процесів хешуємо в пулі потоків, а не в циклі подій
+async def hash_password_async(password: str) -> str:
+    if HASH_POOL_SIZE <= 0:
+        return await run_in_threadpool(hash_password, password)
+    return await asyncio.wrap_future(_submit(_hash, password))
+
+
+async def verify_password_async(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    if HASH_POOL_SIZE <= 0:
+        return await run_in_threadpool(verify_password, password, hashed_password)
+    return await asyncio.wrap_future(_submit(_verify_and_update, password, hashed_password))
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import crud
+import database
+
+logger = logging.getLogger(__name__)
+
+# **Налаштування фонових задач**
+# Скільки задач виконується одночасно (і скільки потоків БД вони займають)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Скільки задач може чекати в черзі, перш ніж POST /jobs/ відповідатиме 503
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+# Контактів в одній порції (одна коротка транзакція)
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "1000"))
+# Пауза між порціями, щоб задачі не витісняли запити API
+JOB_CHUNK_PAUSE = float(os.getenv("JOB_CHUNK_PAUSE", "0.01"))
+# Скільки секунд зберігати стан завершених задач
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "3600"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class QueueFull(Exception):
+    pass
+
+
+# **Стан задачі: прогрес і checkpoint (останній оброблений id), з якого її можна продовжити**
+class Job:
+    def __init__(self, kind: str, owner_id: int, params: dict, after_id: int | None = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner_id = owner_id
+        self.params = params
+        self.status = QUEUED
+        self.processed = 0
+        self.total = None
+        self.checkpoint = after_id
+        self.result = {}
+        self.error = None
+        self.cancel_requested = False
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+
+    def as_dict(self) -> dict:
+        progress = None
+        if self.total:
+            progress = round(min(1.0, self.processed / self.total), 4)
+        elif self.status == SUCCEEDED:
+            progress = 1.0
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "processed": self.processed,
+            "total": self.total,
+            "progress": progress,
+            "checkpoint": self.checkpoint,
+            "result": dict(self.result),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# **Обробники однієї порції: (db, job, after_id, last_id) → лічильники для job.result**
+def _dedupe_chunk(db, job: Job, after_id, last_id) -> dict:
+    found = crud.delete_duplicate_contacts(db, job.owner_id, after_id, last_id, dry_run=job.params["dry_run"])
+    return {"duplicates_found" if job.params["dry_run"] else "duplicates_deleted": found}
+
+
+def _birthday_key_chunk(db, job: Job, after_id, last_id) -> dict:
+    return {"updated": crud.recompute_birthday_keys(db, job.owner_id, after_id, last_id)}
+
+
+def _birthday_reminders_chunk(db, job: Job, after_id, last_id) -> dict:
+    today = date.fromisoformat(job.params["today"])
+    contacts = crud.get_birthday_contacts_chunk(db, job.owner_id, after_id, last_id, today, job.params["days"])
+    if contacts:
+        _reminder_sender(job.owner_id, contacts)
+    return {"reminders": len(contacts)}
+
+
+HANDLERS = {
+    "dedupe_contacts": _dedupe_chunk,
+    "recompute_birthday_keys": _birthday_key_chunk,
+    "birthday_reminders": _birthday_reminders_chunk,
+}
+
+
+def _log_reminders(owner_id: int, contacts: list[dict]):
+    for contact in contacts:
+        logger.info("Birthday reminder for user %s: %s %s (%s)", owner_id,
+                    contact["first_name"], contact["last_name"], contact["birthday"])
+
+
+# Доставка нагадувань (email, push тощо) підключається через set_reminder_sender
+_reminder_sender = _log_reminders
+
+
+def set_reminder_sender(sender):
+    global _reminder_sender
+    _reminder_sender = sender
+
+
+# **Виконання однієї порції: True — можуть бути ще контакти**
+def _run_chunk(db, job: Job) -> bool:
+    if job.total is None:
+        # Лише контакти після checkpoint (after_id або місце зупинки), щоб прогрес доходив до 1.0
+        job.total = job.processed + crud.count_contacts(db, job.owner_id, job.checkpoint)
+    last_id, size = crud.next_contacts_chunk(db, job.owner_id, job.checkpoint, JOB_CHUNK_SIZE)
+    if last_id is None:
+        return False
+    counters = HANDLERS[job.kind](db, job, job.checkpoint, last_id)
+    for name, value in counters.items():
+        job.result[name] = job.result.get(name, 0) + value
+    # Checkpoint зсувається лише після завершеної порції: повтор з нього безпечний
+    job.checkpoint = last_id
+    job.processed += size
+    return size == JOB_CHUNK_SIZE
+
+
+def _run_chunk_in_thread(job: Job) -> bool:
+    with database.SessionLocal() as db:
+        return _run_chunk(db, job)
+
+
+async def _run_next_chunk(job: Job) -> bool:
+    # Режим async: та сама порція через AsyncSession.run_sync на асинхронному пулі;
+    # режим sync: в окремому пулі потоків (не займає потоки запитів API)
+    if database.DB_ASYNC:
+        async with database.AsyncSessionLocal() as db:
+            return await db.run_sync(_run_chunk, job)
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), _run_chunk_in_thread, job)
+
+
+async def _run(job: Job):
+    job.status = RUNNING
+    job.started_at = job.started_at or datetime.utcnow()
+    job.error = None
+    try:
+        while not job.cancel_requested:
+            if not await _run_next_chunk(job):
+                break
+            await asyncio.sleep(JOB_CHUNK_PAUSE)
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed at checkpoint %s", job.id, job.kind, job.checkpoint)
+        job.status = FAILED
+        job.error = str(exc)
+    else:
+        job.status = CANCELLED if job.cancel_requested else SUCCEEDED
+    job.finished_at = datetime.utcnow()
+
+
+# **Черга та пул воркерів (створюються ліниво в циклі подій застосунку)**
+_jobs = {}
+_jobs_lock = threading.Lock()
+_queue = None
+_workers = []
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+    return _executor
+
+
+async def _worker():
+    while True:
+        job = await _queue.get()
+        try:
+            if job.cancel_requested:
+                job.status = CANCELLED
+                job.finished_at = datetime.utcnow()
+            else:
+                await _run(job)
+        finally:
+            _queue.task_done()
+
+
+def _ensure_workers():
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=JOB_QUEUE_SIZE)
+    if not _workers:
+        _workers.extend(asyncio.create_task(_worker()) for _ in range(JOB_WORKERS))
+
+
+def _enqueue(job: Job):
+    _ensure_workers()
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        raise QueueFull()
+    job.status = QUEUED
+    job.finished_at = None
+    job.cancel_requested = False
+
+
+def _purge_finished():
+    # finished_at — наївний UTC, тож і межу рахуємо в UTC (не через timestamp(), що бере локальний пояс)
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_RETENTION)
+    with _jobs_lock:
+        for job_id in [job_id for job_id, job in _jobs.items()
+                       if job.status in FINISHED and job.finished_at and job.finished_at < cutoff]:
+            del _jobs[job_id]
+
+
+# **Створення задачі; QueueFull — черга заповнена**
+def submit(kind: str, owner_id: int, params: dict, after_id: int | None = None) -> Job:
+    _purge_finished()
+    job = Job(kind, owner_id, params, after_id)
+    _enqueue(job)
+    with _jobs_lock:
+        _jobs[job.id] = job
+    return job
+
+
+def get(job_id: str, owner_id: int) -> Job | None:
+    job = _jobs.get(job_id)
+    return job if job is not None and job.owner_id == owner_id else None
+
+
+def list_jobs(owner_id: int) -> list[Job]:
+    with _jobs_lock:
+        jobs = [job for job in _jobs.values() if job.owner_id == owner_id]
+    return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+
+def cancel(job: Job):
+    # Задача зупиниться після поточної порції; checkpoint лишається для resume
+    if job.status not in FINISHED:
+        job.cancel_requested = True
+
+
+def resume(job: Job):
+    # Продовження невдалої або скасованої задачі з її checkpoint; залишок контактів перераховується,
+    # а вікно нагадувань (params["today"]) відраховується від дня продовження, а не від дня створення
+    _enqueue(job)
+    job.total = None
+    if "today" in job.params:
+        job.params["today"] = date.today().isoformat()
+
+
+async def shutdown():
+    global _queue, _executor
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
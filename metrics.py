@@ -0,0 +1,285 @@
+import contextvars
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from fastapi import Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# **Налаштування метрик і профілювання**
+# Скільки однакових SELECT у межах одного запиту вважати ознакою N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+# Профілювання повільних запитів: 0 — вимкнено. Профіль охоплює весь процес (усі потоки, зокрема
+# цикл подій і пул потоків) на час запиту, тож під навантаженням містить і стеки інших запитів
+PROFILE_SLOW_REQUESTS_MS = float(os.getenv("PROFILE_SLOW_REQUESTS_MS", "0"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.1"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+# **Гістограма у форматі Prometheus**
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+# **Реєстр метрик процесу**
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_duration = {}
+        self.request_statements = {}
+        self.statement_duration = {}
+        self.requests_total = Counter()
+        self.n_plus_one_total = Counter()
+
+    def _histogram(self, store: dict, key, buckets) -> Histogram:
+        histogram = store.get(key)
+        if histogram is None:
+            histogram = store[key] = Histogram(buckets)
+        return histogram
+
+    def observe_request(self, method: str, route: str, status: int, duration: float, stats):
+        with self._lock:
+            self.requests_total[(method, route, str(status))] += 1
+            self._histogram(self.request_duration, (method, route), LATENCY_BUCKETS).observe(duration)
+            self._histogram(self.request_statements, (method, route), STATEMENT_COUNT_BUCKETS).observe(stats.statements)
+            if stats.n_plus_one:
+                self.n_plus_one_total[(method, route)] += 1
+
+    def observe_statement(self, route: str, duration: float):
+        with self._lock:
+            self._histogram(self.statement_duration, (route,), LATENCY_BUCKETS).observe(duration)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines += _render_counter(
+                "http_requests_total", "Total HTTP requests.", ("method", "route", "status"), self.requests_total)
+            lines += _render_histograms(
+                "http_request_duration_seconds", "HTTP request latency.", ("method", "route"), self.request_duration)
+            lines += _render_histograms(
+                "db_statements_per_request", "SQL statements executed per HTTP request.", ("method", "route"),
+                self.request_statements)
+            lines += _render_histograms(
+                "db_statement_duration_seconds", "SQL statement latency.", ("route",), self.statement_duration)
+            lines += _render_counter(
+                "db_n_plus_one_total", "Requests with repeated identical SELECT statements.", ("method", "route"),
+                self.n_plus_one_total)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_counter(name, help_text, label_names, counter) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for key, value in sorted(counter.items()):
+        lines.append(f"{name}{_labels(label_names, key)} {value}")
+    return lines
+
+
+def _render_histograms(name, help_text, label_names, histograms) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, histogram in sorted(histograms.items()):
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            bucket_labels = _labels(label_names, key, 'le="%s"' % bound)
+            lines.append(f"{name}_bucket{bucket_labels} {count}")
+        inf_labels = _labels(label_names, key, 'le="+Inf"')
+        lines.append(f"{name}_bucket{inf_labels} {histogram.total}")
+        lines.append(f"{name}_sum{_labels(label_names, key)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(label_names, key)} {histogram.total}")
+    return lines
+
+
+registry = Registry()
+
+
+# **Статистика SQL поточного запиту**
+class RequestStats:
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = 0
+        self.statement_time = 0.0
+        self.selects = Counter()
+        self.n_plus_one = None
+
+    @property
+    def route(self) -> str:
+        # FastAPI кладе маршрут у scope під час маршрутизації, тобто ще до виконання SQL
+        route = self.scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+
+# Поточний запит; у пул потоків sync-маршрутів контекст копіюється, тож об'єкт спільний
+_current = contextvars.ContextVar("request_stats", default=None)
+
+_NUMBER_RE = re.compile(r"\b\d+\b")
+
+
+# **Хуки SQLAlchemy: кількість і тривалість запитів**
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _current.get()
+    if stats is None:
+        registry.observe_statement("background", duration)
+        return
+
+    stats.statements += 1
+    stats.statement_time += duration
+    registry.observe_statement(stats.route, duration)
+    if statement.lstrip()[:6].upper() == "SELECT":
+        # Однаковий текст запиту (з різними параметрами) — кандидат на N+1
+        fingerprint = _NUMBER_RE.sub("?", statement)
+        stats.selects[fingerprint] += 1
+        if stats.selects[fingerprint] == N_PLUS_ONE_THRESHOLD:
+            stats.n_plus_one = fingerprint
+
+
+def instrument_engine(engine=Engine):
+    # За замовчуванням — на клас Engine, тобто й на engine, створені пізніше (вони ліниві);
+    # для AsyncEngine події вішаються на його синхронний engine
+    engine = getattr(engine, "sync_engine", engine)
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# **Семплюючий профайлер: один потік на процес, працює, поки є хоч один профільований запит**
+class StackSampler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self) -> Counter:
+        # Лічильник стеків, що наповнюватиметься до end()
+        profile = Counter()
+        with self._lock:
+            self._profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def end(self, profile: Counter):
+        with self._lock:
+            self._profiles.remove(profile)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                profiles = list(self._profiles)
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                # Корінь стека — назва потоку, щоб у flamegraph відрізняти цикл подій від пулу потоків
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                key = ";".join(reversed(stack))
+                for profile in profiles:
+                    profile[key] += 1
+
+
+def dump_profile(profile: Counter, path: Path):
+    # Формат "collapsed stacks" для flamegraph.pl / speedscope
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"{stack} {count}\n" for stack, count in profile.most_common()))
+
+
+_sampler = StackSampler(PROFILE_INTERVAL)
+
+
+# **ASGI middleware: затримка, кількість SQL-запитів, N+1 та профілювання**
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        status_code = 500
+        profile = None
+        if PROFILE_SLOW_REQUESTS_MS > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            profile = _sampler.begin()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            _current.reset(token)
+            route = stats.route
+            registry.observe_request(scope["method"], route, status_code, duration, stats)
+            if stats.n_plus_one:
+                logger.warning("Possible N+1 on %s %s: %s", scope["method"], route, stats.n_plus_one)
+            if profile is not None:
+                _sampler.end(profile)
+                if duration * 1000 >= PROFILE_SLOW_REQUESTS_MS:
+                    # Ім'я з префіксом process-: це профіль усього процесу за час запиту, а не лише його потоку
+                    route_name = re.sub(r'[^A-Za-z0-9]+', '_', route)
+                    name = f"process-{int(time.time() * 1000)}-{scope['method']}-{route_name}.folded"
+                    dump_profile(profile, PROFILE_DIR / name)
+                    logger.warning("Slow request %s %s took %.1f ms, process-wide profile saved to %s",
+                                   scope["method"], route, duration * 1000, PROFILE_DIR / name)
+
+
+# **Ендпоінт /metrics**
+def metrics_endpoint():
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
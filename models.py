@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Date, Text, ForeignKey, DateTime, Index, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
@@ -14,6 +14,8 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Лічильник змін контактів користувача (ETag і кеш відповідей); збільшується в тій самій транзакції, що й зміна
+    contacts_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Зв'язок один-до-багатьох з контактами
     contacts = relationship("Contact", back_populates="owner")
@@ -23,19 +25,50 @@ class Contact(Base):
     __tablename__ = "contacts"  # Назва таблиці в базі даних
 
     # Опис полів таблиці
-    id = Column(Integer, primary_key=True, index=True)  # Унікальний ідентифікатор
-    first_name = Column(String, index=True)  # Ім'я контакту
-    last_name = Column(String, index=True)  # Прізвище контакту
-    email = Column(String, unique=True, index=True)  # Електронна адреса контакту
+    id = Column(Integer, primary_key=True)  # Унікальний ідентифікатор
+    first_name = Column(String)  # Ім'я контакту
+    last_name = Column(String)  # Прізвище контакту
+    email = Column(String)  # Електронна адреса контакту (унікальна в межах власника)
     phone_number = Column(String)  # Номер телефону контакту
     birthday = Column(Date)  # Дата народження контакту
+    birthday_key = Column(Integer, nullable=True)  # Місяць і день народження як MMDD (див. birthday_key())
     additional_info = Column(Text, nullable=True)  # Додаткові дані (необов'язкові)
     created_at = Column(DateTime, default=datetime.utcnow)  # Дата створення контакту
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Версія для оптимістичного блокування
 
     # Нове поле для зв’язку контакту з користувачем
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     owner = relationship("User", back_populates="contacts")  # Власник контакту
 
+    # Усі запити до контактів обмежені власником, тож owner_id — перший стовпець кожного індексу
+    __table_args__ = (
+        # Keyset-пагінація, потоковий експорт і пошук за id у межах власника
+        Index("ix_contacts_owner_id_id", "owner_id", "id"),
+        # Сортування за прізвищем та ім'ям (той самий вираз lower(), що й у crud.search_contacts)
+        Index("ix_contacts_owner_name", "owner_id", func.lower(last_name), func.lower(first_name)),
+        # Email унікальний в межах власника, а не серед усіх користувачів
+        Index("ix_contacts_owner_email", "owner_id", "email", unique=True),
+        # Пошук найближчих днів народження в межах власника
+        Index("ix_contacts_owner_birthday_key", "owner_id", "birthday_key"),
+    )
+
+
+# Ключ дня народження без року (MMDD), щоб діапазон "наступні N днів" покривався індексом
+def birthday_key(value: date | None) -> int | None:
+    if value is None:
+        return None
+    return value.month * 100 + value.day
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    # jti відкликаного токена: вставка з тим самим jti вдруге не пройде (ротація refresh-токена один раз)
+    jti = Column(String, primary_key=True)
+    token_type = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # Після цього запис можна видалити
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
 
 # Відповідь API для контактів
 class ContactResponse(BaseModel):
@@ -0,0 +1,25 @@
+import base64
+import json
+
+# **Пагінація контактів**
+CONTACTS_PAGE_SIZE = 100
+CONTACTS_MAX_PAGE_SIZE = 1000
+CONTACTS_STREAM_CHUNK_SIZE = 1000
+
+
+# Курсор — непрозорий для клієнта рядок, що кодує id останнього контакту сторінки
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = data["id"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise ValueError("Invalid cursor")
+    return last_id
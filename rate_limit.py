@@ -0,0 +1,167 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+
+import auth
+import serialization
+from user_cache import TTLCache
+
+# **Налаштування обмеження частоти запитів (token bucket)**
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Поповнення відра (токенів за секунду) і його місткість (допустимий сплеск)
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "100"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# IP клієнта з X-Forwarded-For — лише за довіреним проксі
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+# **Налаштування обмеження одночасних запитів (0 — вимкнено)**
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "40"))
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "100"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+
+# Вартість маршрутів у токенах (решта — DEFAULT_COST): bcrypt і повні вибірки значно дорожчі
+DEFAULT_COST = 1
+ROUTE_COSTS = {
+    ("POST", "/register/"): 10,
+    ("POST", "/login/"): 10,
+    ("POST", "/refresh/"): 2,
+    ("GET", "/contacts/search"): 2,
+    ("GET", "/contacts/birthdays"): 2,
+    ("POST", "/contacts/batch"): 10,
+    ("POST", "/contacts/import"): 20,
+    ("GET", "/contacts/export"): 20,
+    ("POST", "/jobs/"): 10,
+}
+STREAM_COST = 20
+# Маршрути без обмежень (збір метрик)
+EXEMPT_PATHS = {"/metrics"}
+
+
+def route_cost(method: str, path: str, query_string: bytes) -> float:
+    if method == "GET" and path == "/contacts/" and b"stream" in query_string:
+        # Потік усіх контактів коштує як експорт
+        if parse_qs(query_string.decode("latin-1")).get("stream", [""])[-1].lower() in ("1", "true", "yes", "on"):
+            return STREAM_COST
+    return ROUTE_COSTS.get((method, path), DEFAULT_COST)
+
+
+# **Відра в пам'яті воркера; спільне сховище (Redis тощо) підключається через set_bucket_store**
+class LocalBucketStore:
+    def __init__(self, maxsize: int = RATE_LIMIT_MAX_KEYS):
+        # Витіснене неактивне відро відповідає повному відру, тож обмеження пам'яті нічого не ламає
+        self._buckets = TTLCache(maxsize=maxsize, ttl=RATE_LIMIT_BURST / RATE_LIMIT_RATE)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> tuple[bool, float, float]:
+        # Повертає (дозволено, залишок токенів, через скільки секунд повторити)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key) or (burst, now)
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets.set(key, (tokens, now), ttl=(burst - tokens) / rate)
+        retry_after = 0.0 if allowed else (cost - tokens) / rate
+        return allowed, tokens, retry_after
+
+
+_store = LocalBucketStore()
+
+
+def set_bucket_store(store):
+    global _store
+    _store = store
+
+
+def _headers(scope) -> dict:
+    return {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+
+
+def client_key(scope, headers: dict) -> str:
+    # Автентифікований користувач — за sub із перевіреного токена (кешується в auth), інакше за IP
+    authorization = headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            return "user:" + auth.decode_token(authorization[7:])["sub"]
+        except HTTPException:
+            pass
+    if RATE_LIMIT_TRUST_FORWARDED and headers.get("x-forwarded-for"):
+        return "ip:" + headers["x-forwarded-for"].split(",")[0].strip()
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float, extra_headers=()):
+    body = serialization.dumps({"detail": detail})
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        *extra_headers,
+    ]
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+# **ASGI middleware: token bucket за користувачем/IP з вагою маршруту → 429**
+class RateLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not RATE_LIMIT_ENABLED or scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        cost = min(route_cost(scope["method"], scope["path"], scope.get("query_string", b"")), RATE_LIMIT_BURST)
+        key = client_key(scope, _headers(scope))
+        allowed, remaining, retry_after = _store.take(key, cost, RATE_LIMIT_RATE, RATE_LIMIT_BURST)
+        if not allowed:
+            await _reject(send, 429, "Too many requests", retry_after,
+                          [(b"x-ratelimit-remaining", str(int(remaining)).encode())])
+            return
+        await self.app(scope, receive, send)
+
+
+# **ASGI middleware: обмеження одночасних запитів; коротка черга, надлишок → 503 одразу**
+class ConcurrencyLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._semaphore = None
+        self._waiting = 0
+
+    async def __call__(self, scope, receive, send):
+        if MAX_CONCURRENT_REQUESTS <= 0 or scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        if self._semaphore is None:
+            # Створюємо в циклі подій, який обслуговує запити
+            self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+        if self._semaphore.locked():
+            if self._waiting >= MAX_QUEUED_REQUESTS:
+                await _reject(send, 503, "Server is overloaded, try again later", 1)
+                return
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), ADMISSION_QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                await _reject(send, 503, "Server is overloaded, try again later", 1)
+                return
+            finally:
+                self._waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._semaphore.release()
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi import Response
+
+import serialization
+
+# **Налаштування кешу відповідей**
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Тіла відповідей зберігаються в пам'яті воркера, але ключ містить версію контактів власника
+# з БД (users.contacts_version, див. crud.get_contacts_version): зміна через будь-який воркер
+# змінює версію, тож застарілі записи більше не знаходяться і витісняються як LRU
+
+
+# **LRU-кеш тіл відповідей, обмежений сумарним розміром**
+class ResponseCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+            return item
+
+    def set(self, key, body: bytes, headers: dict):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self._data[key] = (body, headers)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+
+def make_etag(owner_id: int, version: int, key: tuple) -> str:
+    digest = hashlib.blake2b(repr((owner_id, version, key)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # "*" не обробляємо: до запиту в БД невідомо, чи ресурс існує, тож відповідаємо повністю
+    if not if_none_match:
+        return False
+    # Порівнюємо без урахування префікса слабкого ETag
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+# **Закешована відповідь або 304; None — потрібно будувати відповідь**
+# version читається з БД до запиту даних: відповідь, збережена під нею, не старша за цю версію
+def lookup(owner_id: int, version: int, key: tuple, if_none_match: str | None):
+    etag = make_etag(owner_id, version, key)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    cached = _cache.get((owner_id, version, key))
+    if cached is not None:
+        body, headers = cached
+        return _json_response(body, etag, headers)
+    return None
+
+
+# **Серіалізація та збереження відповіді під версією, переданою в lookup**
+def store(owner_id: int, version: int, key: tuple, payload, headers: dict | None = None) -> Response:
+    body = serialization.dumps(payload)
+    headers = headers or {}
+    _cache.set((owner_id, version, key), body, headers)
+    return _json_response(body, make_etag(owner_id, version, key), headers)
+
+
+def _json_response(body: bytes, etag: str, headers: dict) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={**headers, "ETag": etag, "Cache-Control": "private, no-cache"},
+    )
+
+
+def clear():
+    _cache.clear()
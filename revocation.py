@@ -0,0 +1,64 @@
+import threading
+import time
+
+# Як часто прибирати прострочені записи (секунди)
+PURGE_INTERVAL = 60
+
+
+# **Множина відкликаних токенів: jti → момент закінчення дії токена (epoch)**
+class RevokedSet:
+    def __init__(self):
+        self._expires = {}
+        self._lock = threading.Lock()
+        self._purged_at = time.monotonic()
+
+    def add(self, jti: str, expires_at: float) -> bool:
+        # True, якщо токен відкликано щойно (а не раніше)
+        with self._lock:
+            self._purge_if_due()
+            current = self._expires.get(jti)
+            if current is not None and current > time.time():
+                return False
+            self._expires[jti] = expires_at
+            return True
+
+    def __contains__(self, jti: str) -> bool:
+        # Читання dict без блокування: перевірка на гарячому шляху лише в пам'яті
+        expires_at = self._expires.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def _purge_if_due(self):
+        # Запис потрібен лише доки сам токен чинний — далі його відкине перевірка exp
+        if time.monotonic() - self._purged_at < PURGE_INTERVAL:
+            return
+        now = time.time()
+        self._expires = {jti: expires_at for jti, expires_at in self._expires.items() if expires_at > now}
+        self._purged_at = time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._expires.clear()
+
+    def __len__(self):
+        return len(self._expires)
+
+
+_revoked = RevokedSet()
+
+
+def revoke(jti: str, expires_at: float) -> bool:
+    return _revoked.add(jti, expires_at)
+
+
+def is_revoked(jti: str) -> bool:
+    return jti in _revoked
+
+
+# **Завантаження відкликань, зроблених іншими воркерами (з таблиці revoked_tokens)**
+def load(entries):
+    for jti, expires_at in entries:
+        _revoked.add(jti, expires_at)
+
+
+def clear():
+    _revoked.clear()
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from datetime import date
-from typing import Optional
+from pydantic import BaseModel, Field, validator
+from datetime import date, datetime
+from typing import Any, Dict, List, Literal, Optional
 
 
 # Модель для створення контакту
@@ -19,11 +19,18 @@ class ContactCreate(BaseModel):
 # Модель для відповіді на запит контакту
 class ContactResponse(ContactCreate):
     id: int
+    version: int
 
     class Config:
         orm_mode = True
 
 
+# Модель для відповіді зі списком найближчих днів народження
+class UpcomingBirthday(ContactResponse):
+    next_birthday: date
+    days_until: int
+
+
 # Модель для пошукових запитів
 class ContactSearch(BaseModel):
     first_name: Optional[str] = None
@@ -40,10 +47,75 @@ class ContactUpdate(BaseModel):
     birthday: Optional[date] = None
     additional_info: Optional[str] = None
 
+    # Очистити (null) можна лише необов'язкові поля
+    @validator("first_name", "last_name", "email", "phone_number", "birthday", pre=True)
+    def required_fields_not_null(cls, value):
+        if value is None:
+            raise ValueError("field cannot be cleared")
+        return value
+
     class Config:
         orm_mode = True
 
 
+# Одна операція пакетного запиту: data — поля ContactCreate (create) або ContactUpdate (update)
+class ContactOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None
+    version: Optional[int] = None
+    data: Optional[Dict[str, Any]] = None
+
+
+# Модель пакетного запиту: atomic — все або нічого, per_item — кожна операція окремо
+class ContactBatchRequest(BaseModel):
+    mode: Literal["atomic", "per_item"] = "atomic"
+    operations: List[ContactOperation]
+
+
+# Результат однієї операції пакетного запиту
+class ContactOperationResult(BaseModel):
+    index: int
+    op: str
+    status: int
+    id: Optional[int] = None
+    contact: Optional[ContactResponse] = None
+    error: Optional[Any] = None
+
+
+# Модель для відповіді на пакетний запит
+class ContactBatchResponse(BaseModel):
+    mode: str
+    applied: bool
+    results: List[ContactOperationResult]
+
+
+# Запуск фонової задачі над контактами поточного користувача
+class JobCreate(BaseModel):
+    kind: Literal["dedupe_contacts", "recompute_birthday_keys", "birthday_reminders"]
+    # Днів наперед для birthday_reminders
+    days: int = Field(7, ge=0, le=366)
+    # dedupe_contacts: лише порахувати дублікати, нічого не видаляючи
+    dry_run: bool = False
+    # Почати після цього id (checkpoint попереднього запуску)
+    after_id: Optional[int] = None
+
+
+# Стан фонової задачі
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    processed: int
+    total: Optional[int] = None
+    progress: Optional[float] = None
+    checkpoint: Optional[int] = None
+    result: Dict[str, Any]
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
 # Модель для реєстрації користувача
 class UserCreate(BaseModel):
     email: str
@@ -73,3 +145,27 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+
+
+# Поля ContactResponse у порядку відповіді
+CONTACT_FIELDS = ("id", "first_name", "last_name", "email", "phone_number", "birthday", "additional_info", "version")
+
+
+# **Рядок із select(*crud.CONTACT_COLUMNS) у dict відповіді (дати кодує serialization.dumps)**
+def contact_row_to_dict(row) -> dict:
+    return dict(zip(CONTACT_FIELDS, row))
+
+
+# **Серіалізація контакту для NDJSON-потоку**
+def contact_to_dict(contact) -> dict:
+    # Ті самі поля, що й у ContactResponse
+    return {
+        "id": contact.id,
+        "first_name": contact.first_name,
+        "last_name": contact.last_name,
+        "email": contact.email,
+        "phone_number": contact.phone_number,
+        "birthday": contact.birthday.isoformat() if contact.birthday else None,
+        "additional_info": contact.additional_info,
+        "version": contact.version,
+    }
@@ -0,0 +1,130 @@
+import bisect
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+from user_cache import TTLCache
+
+# In-memory індекс пошуку контактів для SQLite (у Postgres працюють pg_trgm/tsvector індекси)
+SEARCH_INDEX_OWNERS = int(os.getenv("SEARCH_INDEX_OWNERS", "256"))
+SEARCH_INDEX_TTL = int(os.getenv("SEARCH_INDEX_TTL", "300"))
+# Той самий поріг, що й pg_trgm.similarity_threshold за замовчуванням
+SIMILARITY_THRESHOLD = 0.3
+
+FIELDS = ("first_name", "last_name", "email")
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(value: str | None) -> list[str]:
+    # Слова поля плюс усе значення цілком (щоб "john@x.com" знаходився за префіксом "john@")
+    if not value:
+        return []
+    value = value.lower()
+    tokens = value.split()
+    tokens.extend(_WORD_RE.findall(value))
+    tokens.append(value)
+    return tokens
+
+
+def trigrams(value: str) -> set[str]:
+    # Як у pg_trgm: кожне слово доповнюється двома пробілами спереду та одним ззаду
+    result = set()
+    for word in _WORD_RE.findall(value.lower()):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# **Індекс контактів одного власника**
+class ContactSearchIndex:
+    def __init__(self, rows):
+        # rows — кортежі (id, first_name, last_name, email)
+        self._fields = {}
+        self._tokens = []
+        self._trigrams = defaultdict(list)
+        for contact_id, *values in rows:
+            fields = tuple((value or "").lower() for value in values)
+            self._fields[contact_id] = fields
+            for value in fields:
+                self._tokens.extend((token, contact_id) for token in tokenize(value))
+            for gram in trigrams(" ".join(fields)):
+                self._trigrams[gram].append(contact_id)
+        self._tokens.sort()
+
+    def _prefix_ids(self, term: str) -> set[int]:
+        ids = set()
+        i = bisect.bisect_left(self._tokens, (term,))
+        while i < len(self._tokens) and self._tokens[i][0].startswith(term):
+            ids.add(self._tokens[i][1])
+            i += 1
+        return ids
+
+    def prefix(self, q: str) -> set[int]:
+        # Кожне слово запиту має бути префіксом якогось слова контакту
+        ids = None
+        for term in q.lower().split():
+            found = self._prefix_ids(term)
+            ids = found if ids is None else ids & found
+            if not ids:
+                return set()
+        return ids or set()
+
+    def fuzzy(self, q: str) -> list[tuple[float, int]]:
+        grams = trigrams(q)
+        if not grams:
+            return []
+        # similarity >= t можлива лише якщо спільних триграм не менше t * |grams|
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._trigrams.get(gram, ()))
+        min_shared = math.ceil(SIMILARITY_THRESHOLD * len(grams))
+        scored = []
+        for contact_id, shared in counts.items():
+            if shared < min_shared:
+                continue
+            score = max(similarity(grams, trigrams(value)) for value in self._fields[contact_id])
+            if score >= SIMILARITY_THRESHOLD:
+                scored.append((score, contact_id))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored
+
+    def filter_fields(self, ids, filters: dict) -> list[int]:
+        # Пошук за окремими полями (ContactSearch) — регістронезалежний префікс
+        result = []
+        for contact_id in ids:
+            fields = self._fields[contact_id]
+            if all(fields[FIELDS.index(name)].startswith(value.lower()) for name, value in filters.items()):
+                result.append(contact_id)
+        return result
+
+    def all_ids(self):
+        return self._fields.keys()
+
+    def sort_key(self, contact_id: int):
+        # Той самий порядок, що й у Postgres: lower(last_name), lower(first_name), id
+        first_name, last_name, _ = self._fields[contact_id]
+        return last_name, first_name, contact_id
+
+
+_indexes = TTLCache(maxsize=SEARCH_INDEX_OWNERS, ttl=SEARCH_INDEX_TTL)
+
+
+def get_index(owner_id: int, load_rows) -> ContactSearchIndex:
+    index = _indexes.get(owner_id)
+    if index is None:
+        index = ContactSearchIndex(load_rows())
+        _indexes.set(owner_id, index)
+    return index
+
+
+# **Скидання індексу власника після зміни його контактів**
+def invalidate(owner_id: int):
+    _indexes.delete(owner_id)
@@ -0,0 +1,30 @@
+import json
+from datetime import date, datetime
+
+from fastapi.responses import JSONResponse
+
+# orjson — необов'язкова залежність: без неї працює стандартний json (повільніше, той самий результат)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    # orjson кодує дати сам; для json робимо так само — ISO 8601
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# **Компактний JSON у UTF-8**
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+# **Клас відповіді за замовчуванням: валідація response_model лишається, кодування — через dumps**
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
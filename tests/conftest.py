@@ -0,0 +1,56 @@
+import argparse
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.run import configure_environment, migrate  # noqa: E402
+
+# Налаштування мають бути встановлені до імпорту модулів застосунку: SQLite у тимчасовій теці,
+# bcrypt у поточному потоці, без лімітів частоти (DB_MODE береться з оточення, за замовчуванням sync)
+os.environ.setdefault("HASH_POOL_SIZE", "0")
+configure_environment(argparse.Namespace(database_url=None))
+migrate()
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+# **Новий користувач на кожен тест: заголовок Authorization з його access-токеном**
+@pytest.fixture
+def auth_headers(client):
+    credentials = {"email": f"{uuid.uuid4().hex}@example.com", "password": "secret"}
+    assert client.post("/register/", params=credentials).status_code == 201
+    token = client.post("/login/", params=credentials).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+# **Створення контакту поточного користувача через API: create_contact(**поля) → JSON контакту**
+@pytest.fixture
+def create_contact(client, auth_headers):
+    def create(**fields) -> dict:
+        payload = {
+            "first_name": "Ivan",
+            "last_name": "Petrenko",
+            "email": f"{uuid.uuid4().hex}@example.com",
+            "phone_number": "+380501234567",
+            "birthday": "1990-05-17",
+        }
+        payload.update(fields)
+        response = client.post("/contacts/", json=payload, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return create
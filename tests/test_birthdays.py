@@ -0,0 +1,6 @@
+from benchmarks import birthdays
+
+
+# **Найближчі дні народження збігаються з еталоном для кожного дня року (див. benchmarks/birthdays.py)**
+def test_upcoming_birthdays_match_reference():
+    assert birthdays.run_checks() == []
@@ -0,0 +1,55 @@
+# **POST /contacts/batch**
+def test_batch_update_clearing_required_field_is_item_error(client, auth_headers, create_contact):
+    contact = create_contact()
+    response = client.post(
+        "/contacts/batch",
+        json={"operations": [{"op": "update", "id": contact["id"], "data": {"email": None}}]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 422
+    body = response.json()
+    assert body["applied"] is False
+    assert body["results"][0]["status"] == 422
+    [error] = body["results"][0]["error"]
+    assert error.startswith("email: ") and "field cannot be cleared" in error
+
+
+def test_batch_per_item_applies_valid_operations(client, auth_headers, create_contact):
+    contact = create_contact()
+    response = client.post(
+        "/contacts/batch",
+        json={
+            "mode": "per_item",
+            "operations": [
+                {"op": "update", "id": contact["id"], "data": {"email": None}},
+                {"op": "update", "id": contact["id"], "data": {"first_name": "Petro"}},
+            ],
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    statuses = [item["status"] for item in response.json()["results"]]
+    assert statuses == [422, 200]
+    assert client.get(f"/contacts/{contact['id']}", headers=auth_headers).json()["first_name"] == "Petro"
+
+
+# **POST /contacts/import**
+def test_import_reports_non_utf8_rows(client, auth_headers):
+    body = (
+        "first_name,last_name,email,phone_number,birthday\n"
+        "José,Garcia,jose@example.com,+34600000000,1985-03-02\n"
+        "Ivan,Petrenko,ivan@example.com,+380501234567,1990-05-17\n"
+    ).encode("latin-1")
+    response = client.post("/contacts/import", params={"format": "csv"}, content=body, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {"inserted": 1, "failed": 1, "errors": [{"line": 2, "error": "Invalid UTF-8"}]}
+
+
+def test_import_ndjson_reports_non_utf8_rows(client, auth_headers):
+    body = (
+        '{"first_name": "José", "last_name": "Garcia", "email": "jose@example.com", '
+        '"phone_number": "+34600000000", "birthday": "1985-03-02"}\n'
+    ).encode("latin-1")
+    response = client.post("/contacts/import", params={"format": "ndjson"}, content=body, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {"inserted": 0, "failed": 1, "errors": [{"line": 1, "error": "Invalid UTF-8"}]}
@@ -0,0 +1,86 @@
+# **Реєстрація, вхід, ротація та відкликання токенів**
+def test_refresh_token_is_single_use(client):
+    credentials = {"email": "rotation@example.com", "password": "secret"}
+    client.post("/register/", params=credentials)
+    assert client.post("/register/", params=credentials).status_code == 409
+    tokens = client.post("/login/", params=credentials).json()
+
+    rotated = client.post("/refresh/", params={"refresh_token": tokens["refresh_token"]})
+    assert rotated.status_code == 200
+    assert client.post("/refresh/", params={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+    headers = {"Authorization": f"Bearer {rotated.json()['access_token']}"}
+    assert client.post("/logout/", headers=headers).status_code == 200
+    assert client.get("/contacts/", headers=headers).status_code == 401
+
+
+# **CRUD контактів**
+def test_contact_crud(client, auth_headers, create_contact):
+    contact = create_contact(first_name="Olena")
+    assert client.get(f"/contacts/{contact['id']}", headers=auth_headers).json()["first_name"] == "Olena"
+
+    updated = client.put(f"/contacts/{contact['id']}", json={"first_name": "Oksana"}, headers=auth_headers)
+    assert updated.status_code == 200
+    assert updated.json()["version"] == contact["version"] + 1
+
+    stale = client.delete(f"/contacts/{contact['id']}", params={"version": contact["version"]}, headers=auth_headers)
+    assert stale.status_code == 409
+    assert client.delete(f"/contacts/{contact['id']}", headers=auth_headers).status_code == 200
+    assert client.get(f"/contacts/{contact['id']}", headers=auth_headers).status_code == 404
+
+
+def test_duplicate_email_is_conflict(client, auth_headers, create_contact):
+    contact = create_contact()
+    other = create_contact()
+    response = client.put(f"/contacts/{other['id']}", json={"email": contact["email"]}, headers=auth_headers)
+    assert response.status_code == 409
+
+
+# **Пагінація, ETag і потокова видача**
+def test_list_pages_etag_and_stream(client, auth_headers, create_contact):
+    ids = [create_contact()["id"] for _ in range(3)]
+
+    first = client.get("/contacts/", params={"limit": 2}, headers=auth_headers)
+    assert [item["id"] for item in first.json()] == ids[:2]
+    second = client.get("/contacts/", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]}, headers=auth_headers)
+    assert [item["id"] for item in second.json()] == ids[2:]
+    assert "X-Next-Cursor" not in second.headers
+
+    etag = first.headers["ETag"]
+    cached = client.get("/contacts/", params={"limit": 2}, headers={**auth_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    client.put(f"/contacts/{ids[0]}", json={"first_name": "Changed"}, headers=auth_headers)
+    changed = client.get("/contacts/", params={"limit": 2}, headers={**auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()[0]["first_name"] == "Changed"
+
+    streamed = client.get("/contacts/", params={"stream": True}, headers=auth_headers)
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    assert len(streamed.text.splitlines()) == 3
+    exported = client.get("/contacts/export", params={"format": "csv"}, headers=auth_headers)
+    assert len(exported.text.splitlines()) == 4
+
+
+def test_every_contact_write_changes_etag(client, auth_headers, create_contact):
+    contact = create_contact()
+
+    def etag():
+        return client.get("/contacts/", headers=auth_headers).headers["ETag"]
+
+    writes = [
+        lambda: create_contact(),
+        lambda: client.put(f"/contacts/{contact['id']}", json={"first_name": "Changed"}, headers=auth_headers),
+        lambda: client.post("/contacts/batch", json={"operations": [{"op": "delete", "id": contact["id"]}]},
+                            headers=auth_headers),
+        lambda: client.post("/contacts/import", params={"format": "ndjson"}, headers=auth_headers,
+                            content=b'{"first_name": "A", "last_name": "B", "email": "import@example.com", '
+                                    b'"phone_number": "1", "birthday": "2000-01-01"}\n'),
+    ]
+    for write in writes:
+        before = etag()
+        write()
+        assert etag() != before
+
+    before = etag()
+    assert client.delete(f"/contacts/{contact['id']}", headers=auth_headers).status_code == 404
+    assert etag() == before
@@ -0,0 +1,23 @@
+import time
+
+
+def wait_for_job(client, auth_headers, job_id: str, timeout: float = 10.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/jobs/{job_id}", headers=auth_headers).json()
+        if job["status"] in ("succeeded", "failed", "cancelled") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+# **Задача з after_id рахує прогрес лише по контактах після checkpoint**
+def test_job_from_checkpoint_reaches_full_progress(client, auth_headers, create_contact):
+    ids = [create_contact(first_name="Same", phone_number="1")["id"] for _ in range(4)]
+    response = client.post("/jobs/", json={"kind": "dedupe_contacts", "dry_run": True, "after_id": ids[1]},
+                           headers=auth_headers)
+    assert response.status_code == 202
+
+    job = wait_for_job(client, auth_headers, response.json()["id"])
+    assert job["status"] == "succeeded"
+    assert (job["processed"], job["total"], job["progress"]) == (2, 2, 1.0)
+    assert job["result"] == {"duplicates_found": 2}
@@ -0,0 +1,6 @@
+from benchmarks import query_plans
+
+
+# **Ключові запити crud ідуть через індекси власника (див. benchmarks/query_plans.py)**
+def test_query_plans_use_owner_indexes():
+    assert query_plans.run_checks(query_plans.parse_args(["--contacts", "500"])) == []
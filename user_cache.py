@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+# **Налаштування кешу користувачів**
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+
+# Мінімальний знімок користувача, якого достатньо маршрутам (не прив'язаний до сесії БД)
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    email: str
+
+
+# **LRU-кеш із часом життя записів**
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# **Локальна заміна спільного сховища (Redis тощо) з інтерфейсом get/set/delete**
+class LocalStore:
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: str):
+        return self._cache.get(key)
+
+    def set(self, key: str, value, ttl: int):
+        self._cache.set(key, value, ttl)
+
+    def delete(self, key: str):
+        self._cache.delete(key)
+
+
+_local = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+# Спільне сховище між воркерами (None — лише локальний кеш)
+_shared_store = None
+
+
+def set_shared_store(store):
+    global _shared_store
+    _shared_store = store
+
+
+def _key(email: str) -> str:
+    return f"user:{email}"
+
+
+# **Пошук користувача в кеші за email (sub з токена)**
+def get(email: str) -> CurrentUser | None:
+    user = _local.get(email)
+    if user is not None:
+        return user
+    if _shared_store is not None:
+        data = _shared_store.get(_key(email))
+        if data is not None:
+            user = CurrentUser(id=data["id"], email=data["email"])
+            _local.set(email, user)
+            return user
+    return None
+
+
+# **Збереження користувача в кеші**
+def put(db_user) -> CurrentUser:
+    user = CurrentUser(id=db_user.id, email=db_user.email)
+    _local.set(user.email, user)
+    if _shared_store is not None:
+        _shared_store.set(_key(user.email), {"id": user.id, "email": user.email}, USER_CACHE_TTL)
+    return user
+
+
+# **Скидання кешу при зміні користувача**
+def invalidate(email: str):
+    _local.delete(email)
+    if _shared_store is not None:
+        _shared_store.delete(_key(email))
+
+
+def clear():
+    _local.clear()